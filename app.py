@@ -754,9 +754,9 @@ app.register_blueprint(qbo_bp)
 
 database.init_db()
 
-# Start background task queue worker (for transcription, etc.)
-import task_queue
-task_queue.start_worker()
-
 if __name__ == "__main__":
+    # Dev server: run the task queue worker (transcription, etc.) in-process.
+    # In production it is a separate process, see gpu_worker.py.
+    import task_queue
+    task_queue.start_worker()
     app.run(debug=False, host="0.0.0.0", port=5050)
@@ -27,6 +27,16 @@ VIEWER_USERNAME = os.getenv("VIEWER_USERNAME", "viewer")
 VIEWER_PASSWORD = os.getenv("VIEWER_PASSWORD", "viewer")
 
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+# Converted Whisper weights are kept here so restarts load from local disk
+WHISPER_MODEL_DIR = Path(os.getenv("WHISPER_MODEL_DIR", str(INSTANCE_DIR / "whisper_models")))
+# faster-whisper (CTranslate2) placement; "auto" uses CUDA when available
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "auto")
+# Weight quantization; empty picks "int8_float16" on CUDA and "int8" on CPU
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "")
+# 30 s audio windows decoded together in one Whisper generate call
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "8"))
+# Spoken language of uploads; pinning it skips language detection. Empty = detect
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "en") or None
 RATE_LIMIT = int(os.getenv("RATE_LIMIT", "60"))
 MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "30"))
 
@@ -39,6 +49,10 @@ MAPBOX_TOKEN = os.getenv("MAPBOX_TOKEN", "")
 # Ollama (local LLM for task extraction)
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral:7b-instruct")
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
+# Transcriptions shorter than this many words skip LLM task extraction
+MIN_TASK_WORDS = int(os.getenv("MIN_TASK_WORDS", "15"))
+# Concurrent requests process_estimates_batch() sends to Ollama
+OLLAMA_PARALLEL = int(os.getenv("OLLAMA_PARALLEL", "2"))
 
 # Web Push (VAPID) — generate keys once with openssl and store in .env
 # The private key PEM is stored with \n escape sequences in .env; decode them here.
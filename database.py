@@ -1,6 +1,7 @@
 import sqlite3
 import secrets
 import string
+import threading
 from datetime import datetime, timedelta
 
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -12,7 +13,30 @@ import config
 # Connection
 # ---------------------------------------------------------------------------
 
+_thread_conn = threading.local()
+
+
+class _ThreadConnection(sqlite3.Connection):
+    """A connection kept open for its thread; close() only ends the transaction.
+
+    Helpers commit before they close, so close() normally has nothing to
+    roll back. A helper that raises never reaches close(); its partial
+    writes are rolled back by end_thread_transaction() or, at the latest,
+    the next get_db() on the thread.
+    """
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+
 def get_db():
+    conn = getattr(_thread_conn, "conn", None)
+    if conn is not None:
+        # Never hand out a transaction a failed helper left open
+        if conn.in_transaction:
+            conn.rollback()
+        return conn
     conn = sqlite3.connect(str(config.DATABASE_PATH))
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
@@ -20,6 +44,39 @@ def get_db():
     return conn
 
 
+def use_thread_connection():
+    """Make get_db() on the calling thread reuse one persistent connection.
+
+    For the task queue worker's threads, which call these helpers in a
+    loop: one open connection keeps sqlite3's prepared-statement cache
+    warm instead of reconnecting and re-parsing SQL per call. It also
+    uses synchronous=NORMAL (in WAL mode a power loss can drop the last
+    few commits but never corrupts the database) and in-memory temp
+    tables.
+    """
+    if getattr(_thread_conn, "conn", None) is not None:
+        return
+    conn = sqlite3.connect(str(config.DATABASE_PATH), factory=_ThreadConnection)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    _thread_conn.conn = conn
+
+
+def end_thread_transaction():
+    """Roll back a transaction left open on this thread's persistent connection.
+
+    Call after each unit of worker work, so a helper that raised midway
+    doesn't keep SQLite's write lock (blocking the web workers) until the
+    thread next touches the database.
+    """
+    conn = getattr(_thread_conn, "conn", None)
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+
+
 # ---------------------------------------------------------------------------
 # Generic CRUD helpers (private)
 # ---------------------------------------------------------------------------
@@ -750,6 +807,8 @@ def init_db():
     _add_column_if_missing(conn, "estimates",  "qbo_synced_at",    "TEXT DEFAULT ''")
     _add_column_if_missing(conn, "estimates",  "qbo_sync_error",   "TEXT DEFAULT ''")
     _add_column_if_missing(conn, "estimates",  "qbo_sync_token",   "TEXT DEFAULT ''")
+    # When an append recording was queued; claim_next_task orders appends by it
+    _add_column_if_missing(conn, "estimates",  "appended_at",      "TEXT DEFAULT ''")
     _add_column_if_missing(conn, "invoices",   "qbo_invoice_id",   "TEXT DEFAULT ''")
     _add_column_if_missing(conn, "invoices",   "qbo_synced_at",    "TEXT DEFAULT ''")
     _add_column_if_missing(conn, "invoices",   "qbo_sync_error",   "TEXT DEFAULT ''")
@@ -1479,6 +1538,18 @@ def get_job(job_id):
     return dict(row) if row else None
 
 
+def get_jobs(job_ids):
+    """Fetch several jobs in one query. Returns {job_id: job dict}."""
+    ids = list(set(job_ids))
+    if not ids:
+        return {}
+    conn = get_db()
+    ph = ",".join("?" * len(ids))
+    rows = conn.execute(f"SELECT * FROM jobs WHERE id IN ({ph})", ids).fetchall()
+    conn.close()
+    return {r["id"]: dict(r) for r in rows}
+
+
 def create_job(job_name, job_address, latitude, longitude, token_str, customer_id=None):
     conn = get_db()
     now = datetime.now().isoformat()
@@ -1546,6 +1617,18 @@ def get_category(cat_id):
     return _get_by_id("categories", cat_id)
 
 
+def get_categories(cat_ids):
+    """Fetch several categories in one query. Returns {category_id: dict}."""
+    ids = list(set(cat_ids))
+    if not ids:
+        return {}
+    conn = get_db()
+    ph = ",".join("?" * len(ids))
+    rows = conn.execute(f"SELECT * FROM categories WHERE id IN ({ph})", ids).fetchall()
+    conn.close()
+    return {r["id"]: dict(r) for r in rows}
+
+
 def create_category(name, token_str, sort_order=0, account_code=""):
     conn = get_db()
     now = datetime.now().isoformat()
@@ -2147,26 +2230,48 @@ def get_audit_log(token_str, limit=200):
 # Export helpers
 # ---------------------------------------------------------------------------
 
-def get_time_entries_for_export(token_str, date_from=None, date_to=None):
-    conn = get_db()
-    query = """SELECT te.*, e.name as employee_name, e.employee_id as emp_id_str,
-                      e.hourly_wage,
-                      j.job_name, j.job_address
-               FROM time_entries te
-               JOIN employees e ON te.employee_id = e.id
-               JOIN jobs j ON te.job_id = j.id
-               WHERE te.token = ?"""
+def _export_range_filter(token_str, date_from=None, date_to=None):
+    """Return (sql, params) matching a token's entries within a date range."""
+    sql = "te.token = ?"
     params = [token_str]
     if date_from:
-        query += " AND te.clock_in_time >= ?"
+        sql += " AND te.clock_in_time >= ?"
         params.append(date_from)
     if date_to:
-        query += " AND te.clock_in_time <= ?"
+        sql += " AND te.clock_in_time <= ?"
         params.append(date_to + "T23:59:59")
-    query += " ORDER BY te.clock_in_time ASC"
-    rows = conn.execute(query, params).fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+    return sql, params
+
+
+def iter_time_entries_for_export(token_str, date_from=None, date_to=None):
+    """Yield export rows one at a time straight from the cursor.
+
+    Single-pass exports use this instead of get_time_entries_for_export()
+    so a long date range is never held in memory as a list of dicts. The
+    connection is closed when the generator is exhausted or discarded.
+    """
+    where, params = _export_range_filter(token_str, date_from, date_to)
+    conn = get_db()
+    try:
+        cur = conn.execute(
+            f"""SELECT te.*, e.name as employee_name, e.employee_id as emp_id_str,
+                       e.hourly_wage,
+                       j.job_name, j.job_address
+                FROM time_entries te
+                JOIN employees e ON te.employee_id = e.id
+                JOIN jobs j ON te.job_id = j.id
+                WHERE {where}
+                ORDER BY te.clock_in_time ASC""",
+            params,
+        )
+        for r in cur:
+            yield dict(r)
+    finally:
+        conn.close()
+
+
+def get_time_entries_for_export(token_str, date_from=None, date_to=None):
+    return list(iter_time_entries_for_export(token_str, date_from, date_to))
 
 
 def get_effective_rates_for_entries(token_str, entries):
@@ -2195,6 +2300,61 @@ def get_effective_rates_for_entries(token_str, entries):
     return _compute_effective_rates([dict(r) for r in all_rows])
 
 
+def get_effective_rates_for_export(token_str, date_from=None, date_to=None):
+    """Compute OT effective rates for the employees in an export range.
+
+    Same result as get_effective_rates_for_entries() on that range's
+    entries, but selects the employees in SQL so a streamed export can
+    resolve rates before it consumes its entries.
+    """
+    where, params = _export_range_filter(token_str, date_from, date_to)
+    conn = get_db()
+    all_rows = conn.execute(
+        f"""SELECT te.employee_id, te.total_hours, te.clock_in_time, e.hourly_wage
+            FROM time_entries te
+            JOIN employees e ON te.employee_id = e.id
+            WHERE te.token = ? AND te.employee_id IN (
+                SELECT te.employee_id FROM time_entries te WHERE {where})
+            AND te.total_hours IS NOT NULL""",
+        [token_str] + params,
+    ).fetchall()
+    conn.close()
+    return _compute_effective_rates([dict(r) for r in all_rows])
+
+
+def get_export_fingerprint(token_str):
+    """Return a hashable snapshot of everything a token's exports read.
+
+    Covers entry count, latest edit and newest id, employee names, IDs and
+    wages, job names and addresses, and the token's own settings, so it
+    changes whenever a generated report would. Used as a report cache key.
+    """
+    conn = get_db()
+    entries = conn.execute(
+        "SELECT COUNT(*), MAX(updated_at), MAX(id) FROM time_entries WHERE token = ?",
+        (token_str,),
+    ).fetchone()
+    employees = conn.execute(
+        "SELECT id, name, employee_id, hourly_wage FROM employees WHERE token = ? ORDER BY id",
+        (token_str,),
+    ).fetchall()
+    jobs = conn.execute(
+        "SELECT id, job_name, job_address FROM jobs WHERE token = ? ORDER BY id",
+        (token_str,),
+    ).fetchall()
+    token = conn.execute(
+        "SELECT company_name, logo_file, labor_burden_pct FROM tokens WHERE token = ?",
+        (token_str,),
+    ).fetchone()
+    conn.close()
+    return (
+        tuple(entries),
+        tuple(tuple(r) for r in employees),
+        tuple(tuple(r) for r in jobs),
+        tuple(token) if token else None,
+    )
+
+
 # ---------------------------------------------------------------------------
 # Token Labor Burden
 # ---------------------------------------------------------------------------
@@ -2333,22 +2493,22 @@ def _compute_effective_rates(entries):
     Returns: dict keyed by (employee_id, week_start) with:
         total_hours, regular_hours, ot_hours, wage, total_pay, effective_rate
     """
-    from collections import defaultdict
-    emp_weeks = defaultdict(lambda: {"hours": 0.0, "wage": None})
+    emp_weeks = {}  # (employee_id, week_start) -> [hours, wage]
     for e in entries:
         hrs = float(e.get("total_hours") or 0)
         if hrs <= 0:
             continue
         week = _get_week_start_sunday(e["clock_in_time"])
         key = (e["employee_id"], week)
-        emp_weeks[key]["hours"] += hrs
+        acc = emp_weeks.get(key)
+        if acc is None:
+            acc = emp_weeks[key] = [0.0, None]
+        acc[0] += hrs
         if e.get("hourly_wage") is not None:
-            emp_weeks[key]["wage"] = e["hourly_wage"]
+            acc[1] = e["hourly_wage"]
 
     rates = {}
-    for key, data in emp_weeks.items():
-        wage = data["wage"]
-        total = data["hours"]
+    for key, (total, wage) in emp_weeks.items():
         if wage is None or total <= 0:
             rates[key] = {"total_hours": total, "regular_hours": total,
                           "ot_hours": 0, "wage": 0, "total_pay": 0,
@@ -2437,57 +2597,42 @@ def get_weekly_payroll_estimate(token_str):
     }
 
 
-def get_weekly_job_costs(token_str):
-    conn = get_db()
-    sunday_str = _current_week_start_sunday()
-
-    token_row = conn.execute(
-        "SELECT labor_burden_pct FROM tokens WHERE token = ?", (token_str,)
-    ).fetchone()
-    burden_pct = token_row["labor_burden_pct"] if token_row else 0
+def _summarize_job_costs(entries, burden_pct):
+    """Allocate OT-adjusted labor cost to jobs for the job cost widgets.
 
-    # Fetch individual entries so OT can be computed per-employee then allocated
-    rows = conn.execute(
-        """SELECT te.employee_id, te.total_hours, te.clock_in_time,
-                  e.hourly_wage, j.id as job_id, j.job_name
-           FROM time_entries te
-           JOIN jobs j ON te.job_id = j.id
-           JOIN employees e ON te.employee_id = e.id
-           WHERE te.token = ? AND te.clock_in_time >= ? AND te.total_hours IS NOT NULL
-           ORDER BY j.job_name""",
-        (token_str, sunday_str),
-    ).fetchall()
-    conn.close()
-
-    entries = [dict(r) for r in rows]
+    Returns {"jobs": [...], "total_hours", "total_cost"} with jobs ordered
+    by hours, most first.
+    """
     eff_rates = _compute_effective_rates(entries)
 
-    from collections import defaultdict
-    job_agg = defaultdict(lambda: {"hours": 0.0, "base": 0.0})
+    job_agg = {}  # job_id -> [job_name, hours, base]
     for e in entries:
         hrs = float(e["total_hours"] or 0)
         if hrs <= 0:
             continue
         jid = e["job_id"]
-        job_agg[jid]["job_name"] = e["job_name"]
-        job_agg[jid]["hours"] += hrs
+        acc = job_agg.get(jid)
+        if acc is None:
+            acc = job_agg[jid] = [None, 0.0, 0.0]
+        acc[0] = e["job_name"]
+        acc[1] += hrs
         week = _get_week_start_sunday(e["clock_in_time"])
         rate_info = eff_rates.get((e["employee_id"], week))
         if rate_info and rate_info["effective_rate"]:
-            job_agg[jid]["base"] += hrs * rate_info["effective_rate"]
+            acc[2] += hrs * rate_info["effective_rate"]
 
     jobs = []
     total_hours = 0.0
     total_cost = 0.0
-    for jid, jd in sorted(job_agg.items(), key=lambda x: x[1]["hours"], reverse=True):
-        hours = round(jd["hours"], 2)
-        base = round(jd["base"], 2)
+    for job_name, hours, base in sorted(job_agg.values(), key=lambda x: x[1], reverse=True):
+        hours = round(hours, 2)
+        base = round(base, 2)
         burden = round(base * (burden_pct / 100), 2)
         cost = round(base + burden, 2)
         total_hours += hours
         total_cost += cost
         jobs.append({
-            "job_name": jd["job_name"],
+            "job_name": job_name,
             "hours": hours,
             "total_cost": cost,
         })
@@ -2499,6 +2644,31 @@ def get_weekly_job_costs(token_str):
     }
 
 
+def get_weekly_job_costs(token_str):
+    conn = get_db()
+    sunday_str = _current_week_start_sunday()
+
+    token_row = conn.execute(
+        "SELECT labor_burden_pct FROM tokens WHERE token = ?", (token_str,)
+    ).fetchone()
+    burden_pct = token_row["labor_burden_pct"] if token_row else 0
+
+    # Fetch individual entries so OT can be computed per-employee then allocated
+    rows = conn.execute(
+        """SELECT te.employee_id, te.total_hours, te.clock_in_time,
+                  e.hourly_wage, j.id as job_id, j.job_name
+           FROM time_entries te
+           JOIN jobs j ON te.job_id = j.id
+           JOIN employees e ON te.employee_id = e.id
+           WHERE te.token = ? AND te.clock_in_time >= ? AND te.total_hours IS NOT NULL
+           ORDER BY j.job_name""",
+        (token_str, sunday_str),
+    ).fetchall()
+    conn.close()
+
+    return _summarize_job_costs([dict(r) for r in rows], burden_pct)
+
+
 def get_alltime_job_costs(token_str):
     """Same as get_weekly_job_costs but covers all completed time entries (no date filter)."""
     conn = get_db()
@@ -2520,44 +2690,7 @@ def get_alltime_job_costs(token_str):
     ).fetchall()
     conn.close()
 
-    entries = [dict(r) for r in rows]
-    eff_rates = _compute_effective_rates(entries)
-
-    from collections import defaultdict
-    job_agg = defaultdict(lambda: {"hours": 0.0, "base": 0.0})
-    for e in entries:
-        hrs = float(e["total_hours"] or 0)
-        if hrs <= 0:
-            continue
-        jid = e["job_id"]
-        job_agg[jid]["job_name"] = e["job_name"]
-        job_agg[jid]["hours"] += hrs
-        week = _get_week_start_sunday(e["clock_in_time"])
-        rate_info = eff_rates.get((e["employee_id"], week))
-        if rate_info and rate_info["effective_rate"]:
-            job_agg[jid]["base"] += hrs * rate_info["effective_rate"]
-
-    jobs = []
-    total_hours = 0.0
-    total_cost = 0.0
-    for jid, jd in sorted(job_agg.items(), key=lambda x: x[1]["hours"], reverse=True):
-        hours = round(jd["hours"], 2)
-        base = round(jd["base"], 2)
-        burden = round(base * (burden_pct / 100), 2)
-        cost = round(base + burden, 2)
-        total_hours += hours
-        total_cost += cost
-        jobs.append({
-            "job_name": jd["job_name"],
-            "hours": hours,
-            "total_cost": cost,
-        })
-
-    return {
-        "jobs": jobs,
-        "total_hours": round(total_hours, 2),
-        "total_cost": round(total_cost, 2),
-    }
+    return _summarize_job_costs([dict(r) for r in rows], burden_pct)
 
 
 def get_job_financials(token_str, active_only=None):
@@ -2778,6 +2911,20 @@ def update_submission_transcription(submission_id, transcription, pdf_file):
     conn.close()
 
 
+def complete_submissions(results):
+    """Mark many submissions complete in one transaction.
+
+    ``results`` is an iterable of (submission_id, transcription, pdf_file).
+    """
+    conn = get_db()
+    conn.executemany(
+        "UPDATE submissions SET transcription = ?, pdf_file = ?, status = 'complete' WHERE id = ?",
+        [(transcription, pdf_file, submission_id) for submission_id, transcription, pdf_file in results],
+    )
+    conn.commit()
+    conn.close()
+
+
 def update_submission_error(submission_id, error_msg):
     conn = get_db()
     conn.execute(
@@ -2865,25 +3012,62 @@ def delete_submission(submission_id):
     return None
 
 
-def claim_next_pending():
-    conn = get_db()
-    row = conn.execute(
-        "SELECT id FROM submissions WHERE status = 'processing' ORDER BY id ASC LIMIT 1"
-    ).fetchone()
-    if not row:
-        conn.close()
-        return None
+def _claim_submissions(conn, limit):
+    """Claim up to ``limit`` pending submissions, oldest first, on ``conn``."""
+    ids = [r["id"] for r in conn.execute(
+        "SELECT id FROM submissions WHERE status = 'processing' ORDER BY timestamp ASC, id ASC LIMIT ?",
+        (limit,),
+    ).fetchall()]
+    if not ids:
+        return []
+    placeholders = ",".join("?" * len(ids))
     conn.execute(
-        "UPDATE submissions SET status = 'transcribing' WHERE id = ? AND status = 'processing'",
-        (row["id"],),
+        f"UPDATE submissions SET status = 'transcribing' WHERE id IN ({placeholders}) AND status = 'processing'",
+        ids,
     )
     conn.commit()
     claimed = conn.execute(
-        "SELECT * FROM submissions WHERE id = ? AND status = 'transcribing'",
-        (row["id"],),
-    ).fetchone()
+        f"SELECT * FROM submissions WHERE id IN ({placeholders}) AND status = 'transcribing' ORDER BY timestamp ASC, id ASC",
+        ids,
+    ).fetchall()
+    return [dict(r) for r in claimed]
+
+
+def claim_next_task(batch_size=8):
+    """Claim the oldest queued background task of any kind, on one connection.
+
+    Returns (kind, rows) with kind 'submission', 'estimate' (transcription)
+    or 'append' (append transcription); pending submissions are claimed
+    together, up to ``batch_size``. Returns (None, []) when idle.
+
+    Tasks are ordered by when they were queued: a submission's timestamp,
+    an estimate's created_at, and an append's appended_at (set when the
+    recording is added), so an append to an old estimate waits its turn.
+    """
+    conn = get_db()
+    head = conn.execute("""
+        SELECT kind, id FROM (
+            SELECT 'submission' AS kind, id, timestamp AS queued_at
+            FROM submissions WHERE status = 'processing'
+            UNION ALL
+            SELECT 'estimate', id, created_at FROM estimates WHERE status = 'processing'
+            UNION ALL
+            SELECT 'append', id, COALESCE(NULLIF(appended_at, ''), created_at)
+            FROM estimates WHERE status = 'appending'
+        ) ORDER BY queued_at ASC, id ASC LIMIT 1
+    """).fetchone()
+    if not head:
+        conn.close()
+        return None, []
+    kind = head["kind"]
+    if kind == "submission":
+        rows = _claim_submissions(conn, batch_size)
+    elif kind == "estimate":
+        rows = _claim_estimate(conn, head["id"], "processing", "transcribing")
+    else:
+        rows = _claim_estimate(conn, head["id"], "appending", "transcribing_append")
     conn.close()
-    return dict(claimed) if claimed else None
+    return kind, rows
 
 
 def toggle_processed(submission_id):
@@ -3303,6 +3487,9 @@ def update_estimate(estimate_id, **kwargs):
     # Auto-stamp completed_at when approval_status is set to 'completed'
     if kwargs.get("approval_status") == "completed" and not kwargs.get("completed_at"):
         kwargs["completed_at"] = datetime.now().isoformat()
+    # Stamp when an append recording is queued, so it waits its turn
+    if kwargs.get("status") == "appending" and not kwargs.get("appended_at"):
+        kwargs["appended_at"] = datetime.now().isoformat()
     conn = get_db()
     allowed = {"title", "transcription", "notes", "status", "approval_status", "estimate_value",
                 "est_materials_cost", "est_labor_cost", "actual_materials_cost", "actual_labor_cost",
@@ -3311,7 +3498,7 @@ def update_estimate(estimate_id, **kwargs):
                 "estimate_number", "date_accepted", "expected_completion",
                 "sales_tax_rate", "customer_message", "completion_pct", "job_id",
                 "client_budget", "append_audio_file", "completed_at", "customer_id",
-                "project_name"}
+                "project_name", "appended_at"}
     sets = []
     params = []
     for k, v in kwargs.items():
@@ -3350,47 +3537,18 @@ def delete_estimate(estimate_id):
     conn.close()
 
 
-def claim_next_pending_estimate():
-    conn = get_db()
-    row = conn.execute(
-        "SELECT id FROM estimates WHERE status = 'processing' ORDER BY id ASC LIMIT 1"
-    ).fetchone()
-    if not row:
-        conn.close()
-        return None
+def _claim_estimate(conn, estimate_id, from_status, to_status):
+    """Claim estimate ``estimate_id`` if still in ``from_status``, as a 0/1-item list."""
     conn.execute(
-        "UPDATE estimates SET status = 'transcribing' WHERE id = ? AND status = 'processing'",
-        (row["id"],),
+        "UPDATE estimates SET status = ? WHERE id = ? AND status = ?",
+        (to_status, estimate_id, from_status),
     )
     conn.commit()
     claimed = conn.execute(
-        "SELECT e.*, j.job_name FROM estimates e LEFT JOIN jobs j ON e.job_id = j.id WHERE e.id = ? AND e.status = 'transcribing'",
-        (row["id"],),
+        "SELECT e.*, j.job_name FROM estimates e LEFT JOIN jobs j ON e.job_id = j.id WHERE e.id = ? AND e.status = ?",
+        (estimate_id, to_status),
     ).fetchone()
-    conn.close()
-    return dict(claimed) if claimed else None
-
-
-def claim_next_appending_estimate():
-    """Atomically claim one estimate with status='appending' for append transcription."""
-    conn = get_db()
-    row = conn.execute(
-        "SELECT id FROM estimates WHERE status = 'appending' ORDER BY id ASC LIMIT 1"
-    ).fetchone()
-    if not row:
-        conn.close()
-        return None
-    conn.execute(
-        "UPDATE estimates SET status = 'transcribing_append' WHERE id = ? AND status = 'appending'",
-        (row["id"],),
-    )
-    conn.commit()
-    claimed = conn.execute(
-        "SELECT e.*, j.job_name FROM estimates e LEFT JOIN jobs j ON e.job_id = j.id WHERE e.id = ? AND e.status = 'transcribing_append'",
-        (row["id"],),
-    ).fetchone()
-    conn.close()
-    return dict(claimed) if claimed else None
+    return [dict(claimed)] if claimed else []
 
 
 def update_estimate_append_transcription(estimate_id, new_text):
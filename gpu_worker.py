@@ -0,0 +1,20 @@
+"""Dedicated task queue worker process.
+
+Runs the transcription / receipt PDF / task extraction loop from
+task_queue.py and is the only process that loads the Whisper model.
+Start exactly one per host (see bdpt-worker.service); the Gunicorn
+workers only queue rows and ping it via task_wake.notify().
+"""
+
+import logging
+
+import database
+import task_queue
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    database.init_db()
+    task_queue.run_worker()
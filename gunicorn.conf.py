@@ -4,7 +4,5 @@ timeout = 300
 accesslog = "-"
 errorlog = "-"
 
-
-def post_fork(server, worker):
-    import task_queue
-    task_queue.start_worker()
+# The task queue worker runs as its own process (gpu_worker.py /
+# bdpt-worker.service), so Gunicorn workers don't start one.
@@ -11,6 +11,7 @@ from flask_login import current_user
 
 import config
 import database
+import task_wake
 
 estimates_bp = Blueprint('estimates', __name__)
 
@@ -191,6 +192,8 @@ def api_estimate_upload():
         created_by=employee["id"],
         status=status,
     )
+    if audio_filename:
+        task_wake.notify()
 
     # Save customer info if provided
     customer_company_name = request.form.get("customer_company_name", "").strip()
@@ -418,6 +421,7 @@ def api_estimate_add_audio(estimate_id):
     audio_file.save(str(save_path))
 
     database.update_estimate(estimate_id, append_audio_file=str(save_path), status="appending")
+    task_wake.notify()
     return jsonify({"ok": True})
 
 
@@ -724,9 +724,7 @@ def download_pdf(job_id, week):
         pdf.cell(0, 4, _safe("Photo contains embedded GPS geotag metadata. Download original for Google posting."), ln=True, align="C")
         pdf.set_text_color(0, 0, 0)
 
-    output = io.BytesIO()
-    pdf.output(output)
-    output.seek(0)
+    output = io.BytesIO(pdf.output())
 
     safe_job_name = _sanitize_job_name(job["job_name"])
     filename = f"{safe_job_name}_{week}_photos.pdf"
@@ -10,6 +10,7 @@ from flask_login import current_user
 
 import config
 import database
+import task_wake
 
 receipts_bp = Blueprint('receipts', __name__)
 
@@ -148,6 +149,13 @@ def api_upload():
     image.save(str(image_path))
     audio.save(str(audio_path))
 
+    # Fix EXIF orientation and build the web thumbnail here, in parallel
+    # across web workers, so the transcription worker only transcribes
+    # and builds the PDF
+    import pdf_generator
+    pdf_generator.fix_image_orientation(image_path)
+    pdf_generator.generate_web_thumbnail(image_path, folder / f"{base_name}_thumb.jpg")
+
     # Optional category / job fields
     job_id = request.form.get("job_id") or None
     category_1_id = request.form.get("category_1_id") or None
@@ -190,6 +198,7 @@ def api_upload():
         receipt_date=receipt_date,
         vendor=vendor,
     )
+    task_wake.notify()
 
     # Notify admins
     try:
@@ -1,13 +1,27 @@
 """Admin timekeeper routes (employees, jobs, time entries, export, audit)."""
 
-from collections import defaultdict
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from datetime import datetime, timezone
 from io import BytesIO
+from operator import itemgetter
+from zipfile import ZIP_DEFLATED, ZipFile
 
 from flask import (
-    Blueprint, abort, flash, jsonify, redirect, render_template, request,
+    Blueprint, abort, after_this_request, flash, jsonify, redirect, render_template, request,
     send_file, url_for,
 )
 from flask_login import current_user, login_required
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.drawing.image import Image as XlImage
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.utils import get_column_letter
+from openpyxl.writer.excel import ExcelWriter
 
 import config
 import database
@@ -135,20 +149,132 @@ def _resize_logo(path, max_w=800, max_h=800, target_kb=750):
     return buf, img.size[0], img.size[1]
 
 
-def _xl_add_logos(ws, token_str, last_row, logo_col="H"):
-    """Add company logo (top-right) and BDB logo (bottom-center) to Excel sheet."""
-    from openpyxl.drawing.image import Image as XlImage
+_XL_HEADER_COLORS = {
+    "green": "FF16A34A",
+    "orange": "FFEA580C",
+    "purple": "FF7C3AED",
+    "blue": "FF2563EB",
+}
+_XL_MONEY_FMT = "#,##0.00"
+
+# Style building blocks are immutable, so they are built once at import
+# and shared by every workbook.
+_XL_THIN = Side(style="thin")
+_XL_BORDER = Border(left=_XL_THIN, right=_XL_THIN, top=_XL_THIN, bottom=_XL_THIN)
+_XL_HEADER_FONT = Font(bold=True, color="FFFFFFFF", size=11)
+_XL_HEADER_ALIGN = Alignment(horizontal="center", vertical="center", wrap_text=True)
+_XL_HEADER_FILLS = {
+    color: PatternFill(start_color=argb, end_color=argb, fill_type="solid")
+    for color, argb in _XL_HEADER_COLORS.items()
+}
+_XL_BOLD_FONT = Font(bold=True, size=11)
+_XL_TITLE_FONT = Font(bold=True, size=14)
+_XL_WARNING_FONT = Font(bold=True, size=11, color="FFDC2626")
+_XL_NOTE_FONT = Font(size=10, color="FF6B7280")
+_XL_SECTION_FONT = Font(bold=True, size=13)
+
+
+def _xl_add_named_styles(wb):
+    """Register the shared report NamedStyles on a workbook.
+
+    Cells take a single ``cell.style = "body"`` assignment instead of
+    separate font/fill/border/format writes, so styles.xml stays at a
+    handful of entries no matter how many rows are written. Wrapping and
+    centering only apply to the header_* styles; the title/section styles
+    carry a font only.
+    """
+    for color, fill in _XL_HEADER_FILLS.items():
+        wb.add_named_style(NamedStyle(
+            name=f"header_{color}", font=_XL_HEADER_FONT, border=_XL_BORDER,
+            alignment=_XL_HEADER_ALIGN, fill=fill,
+        ))
+    wb.add_named_style(NamedStyle(name="body", font=DEFAULT_FONT, border=_XL_BORDER))
+    wb.add_named_style(NamedStyle(name="money", font=DEFAULT_FONT, border=_XL_BORDER,
+                                  number_format=_XL_MONEY_FMT))
+    wb.add_named_style(NamedStyle(name="bold", font=_XL_BOLD_FONT, border=_XL_BORDER))
+    wb.add_named_style(NamedStyle(name="bold_money", font=_XL_BOLD_FONT, border=_XL_BORDER,
+                                  number_format=_XL_MONEY_FMT))
+    for name, font in (("title", _XL_TITLE_FONT), ("warning", _XL_WARNING_FONT),
+                       ("note", _XL_NOTE_FONT), ("section_title", _XL_SECTION_FONT)):
+        wb.add_named_style(NamedStyle(name=name, font=font, border=DEFAULT_BORDER))
+
+
+def _xl_cell(ws, value=None, style="body"):
+    """Build a detached cell for ws.append(), tagged with a named style.
+
+    Works for both regular and write-only worksheets.
+    """
+    c = WriteOnlyCell(ws, value=value)
+    if style:
+        c.style = style
+    return c
+
+
+def _xl_set_column_widths(ws, rows):
+    """Size each column to its longest staged value (capped at 40).
+
+    Works from the cells about to be appended, so there is no second pass
+    over the finished sheet and write-only sheets can be sized too.
+    """
+    widths = {}
+    for row in rows:
+        for i, c in enumerate(row):
+            if c.value:
+                n = len(str(c.value))
+                if n > widths.get(i, 0):
+                    widths[i] = n
+    for i, w in widths.items():
+        ws.column_dimensions[get_column_letter(i + 1)].width = min(w + 3, 40)
+
+
+def _xl_save(wb):
+    """Serialize a workbook into a BytesIO using fast DEFLATE.
+
+    Same as wb.save() but at zlib level 1 instead of the default 6.
+    Files come out larger (roughly half again on big sheets), but the
+    compression step is several times quicker, and it is the slowest
+    part of writing a large export.
+    """
+    if wb.write_only and not wb.worksheets:
+        wb.create_sheet()
+    output = BytesIO()
+    archive = ZipFile(output, "w", ZIP_DEFLATED, allowZip64=True, compresslevel=1)
+    wb.properties.modified = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+    ExcelWriter(wb, archive).save()
+    output.seek(0)
+    return output
+
+
+# Logo resizing (PIL resample + JPEG encode) releases the GIL, so XLSX
+# exports start it here and aggregate entries while it runs.
+_LOGO_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report-logos")
+
+
+def _resize_report_logos(token_str):
+    """Return resized (company, BDB) logos as _resize_logo tuples, or None."""
     logo = _company_logo_path(token_str)
-    if logo:
-        buf, w, h = _resize_logo(logo)
+    return (
+        _resize_logo(logo) if logo else None,
+        _resize_logo(_BDB_LOGO) if _BDB_LOGO.exists() else None,
+    )
+
+
+def _xl_add_logos(ws, logos, last_row, logo_col="H"):
+    """Add company logo (top-right) and BDB logo (bottom-center) to Excel sheet.
+
+    ``logos`` is the pair returned by _resize_report_logos().
+    """
+    company, bdb_logo = logos
+    if company:
+        buf, w, h = company
         img = XlImage(buf)
         # Display small but keep high-res source for clarity
         scale = min(120 / w, 50 / h)
         img.width = int(w * scale)
         img.height = int(h * scale)
         ws.add_image(img, f"{logo_col}1")
-    if _BDB_LOGO.exists():
-        buf, w, h = _resize_logo(_BDB_LOGO)
+    if bdb_logo:
+        buf, w, h = bdb_logo
         bdb = XlImage(buf)
         scale = min(200 / w, 60 / h)
         bdb.width = int(w * scale)
@@ -174,6 +300,37 @@ def _pdf_add_bdb_footer(pdf):
         pdf.image(buf, x=x, y=pdf.h - 22, w=50)
 
 
+def _pdf_send(pdf, filename):
+    """Return a download response for a finished report PDF.
+
+    The PDF is written to a temp file and sent from disk, so the response
+    doesn't hold a second in-memory copy and the server can use its file
+    wrapper (sendfile) for the body. The file is unlinked once the
+    response is built; the already-open handle keeps it readable.
+    """
+    tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    tmp.close()
+    try:
+        pdf.output(tmp.name)
+        response = send_file(
+            tmp.name, as_attachment=True, download_name=filename,
+            mimetype="application/pdf", conditional=True,
+        )
+    except Exception:
+        os.unlink(tmp.name)
+        raise
+
+    @after_this_request
+    def _remove_tmp(resp):
+        try:
+            os.unlink(tmp.name)
+        except OSError:
+            pass
+        return resp
+
+    return response
+
+
 def _pdf_section_header(pdf, title, color_rgb):
     """Draw a colored section title bar. Adds a page if not enough room."""
     # Need ~30mm for section header + table header + at least one data row
@@ -187,6 +344,182 @@ def _pdf_section_header(pdf, title, color_rgb):
     pdf.set_text_color(0, 0, 0)
 
 
+_fromiso = datetime.fromisoformat
+
+
+def _parse_dt(val):
+    """Parse an ISO datetime once for report formatting.
+
+    Returns a datetime, the raw string (truncated) if it doesn't parse,
+    or None when empty.
+    """
+    s = str(val or "")
+    if not s or s == "None":
+        return None
+    try:
+        return _fromiso(s)
+    except ValueError:
+        return s[:16]
+
+
+def _fmt_dt(dt):
+    """Format a value from _parse_dt as 'MM/DD h:MM AM/PM'."""
+    if dt is None:
+        return "\u2014"
+    if isinstance(dt, str):
+        return dt
+    return dt.strftime("%m/%d %-I:%M %p")
+
+
+def _usd(v, _f=format):
+    """Format a dollar amount as '$1,234.56' for PDF table cells."""
+    return "$" + _f(v, ",.2f")
+
+
+def _iter_base_pay(entries, eff_rates):
+    """Yield (entry, hours, day, OT-adjusted base pay) for each entry, in order.
+
+    Hours and the YYYY-MM-DD day are parsed here once per entry and passed
+    along, so consumers don't re-derive them. Accepts a list or a streamed
+    iterator of entries.
+    """
+    rates = {k: v["effective_rate"] for k, v in eff_rates.items()
+             if v and v["effective_rate"]}
+    # Week start depends only on the date; most entries share a few days
+    week_cache = {}
+    rate_get, week_get = rates.get, week_cache.get
+    week_start = database._get_week_start_sunday
+    for e in entries:
+        get = e.get
+        hrs = float(get("total_hours") or 0)
+        day = (get("clock_in_time") or "")[:10]
+        wage = get("hourly_wage")
+        if hrs <= 0 or wage is None:
+            yield e, hrs, day, 0.0
+            continue
+        week = week_get(day)
+        if week is None:
+            week = week_cache[day] = week_start(day)
+        yield e, hrs, day, hrs * rate_get((e["employee_id"], week), wage)
+
+
+def _aggregate_hours(entries):
+    """Group entries for the hours report summary sections in one pass.
+
+    Returns (by_emp, by_emp_job, by_job):
+        by_emp[emp_id], by_emp_job[(emp_id, job)]: [name, hours]
+        by_job[job_name]:                          hours
+    """
+    by_emp, by_emp_job, by_job = {}, {}, {}
+    emp_get, ej_get, job_get = by_emp.get, by_emp_job.get, by_job.get
+    for e in entries:
+        get = e.get
+        hrs = float(get("total_hours") or 0)
+        name = get("employee_name", "")
+        emp_id = get("emp_id_str", "")
+        job_name = get("job_name", "")
+
+        ed = emp_get(emp_id)
+        if ed is None:
+            ed = by_emp[emp_id] = [name, 0.0]
+        ed[0] = name
+        ed[1] += hrs
+
+        key = (emp_id, job_name)
+        ejd = ej_get(key)
+        if ejd is None:
+            ejd = by_emp_job[key] = [name, 0.0]
+        ejd[0] = name
+        ejd[1] += hrs
+
+        by_job[job_name] = job_get(job_name, 0.0) + hrs
+    return by_emp, by_emp_job, by_job
+
+
+def _aggregate_payroll(priced, burden_mul):
+    """Group priced entries for the four payroll report sections.
+
+    ``priced`` yields (entry, hours, day, base_pay) as from _iter_base_pay().
+    Returns (by_emp, by_emp_job, by_job, by_date), plain dicts of
+    positional lists:
+        by_emp[emp_id], by_emp_job[(emp_id, job)]: [name, hours, base, wage]
+        by_job[job_name], by_date[YYYY-MM-DD]:      [hours, base, burden, cost]
+    """
+    by_emp, by_emp_job, by_job, by_date = {}, {}, {}, {}
+    # Bound once: the loop below runs per entry for every payroll export
+    emp_get, ej_get, job_get = by_emp.get, by_emp_job.get, by_job.get
+    # Entries arrive ordered by clock_in_time, so each date is one run
+    run_dt = dd = None
+    for e, hrs, dt, base in priced:
+        get = e.get
+        wage = get("hourly_wage")
+        name = get("employee_name", "")
+        emp_id = get("emp_id_str", "")
+        job_name = get("job_name", "")
+
+        ed = emp_get(emp_id)
+        if ed is None:
+            ed = by_emp[emp_id] = [name, 0.0, 0.0, None]
+        ed[0] = name
+        ed[1] += hrs
+        ed[2] += base
+
+        key = (emp_id, job_name)
+        ejd = ej_get(key)
+        if ejd is None:
+            ejd = by_emp_job[key] = [name, 0.0, 0.0, None]
+        ejd[0] = name
+        ejd[1] += hrs
+        ejd[2] += base
+
+        if wage is not None:
+            ed[3] = wage
+            ejd[3] = wage
+
+        jd = job_get(job_name)
+        if jd is None:
+            jd = by_job[job_name] = [0.0, 0.0, 0.0, 0.0]
+        if dt != run_dt:
+            run_dt = dt
+            dd = by_date.get(dt)
+            if dd is None:
+                dd = by_date[dt] = [0.0, 0.0, 0.0, 0.0]
+        jd[0] += hrs
+        jd[1] += base
+        dd[0] += hrs
+        dd[1] += base
+
+    # Burden is linear in base pay, so it is applied once per group
+    for acc in (*by_job.values(), *by_date.values()):
+        acc[2] = acc[1] * burden_mul
+        acc[3] = acc[1] + acc[2]
+    return by_emp, by_emp_job, by_job, by_date
+
+
+def _sort_report_groups(by_emp, by_emp_job, by_job):
+    """Return by_emp, by_emp_job and by_job items in report order.
+
+    Takes the grouped dicts from _aggregate_hours() or _aggregate_payroll().
+    Rows sort case-insensitively by employee name (then job). Each distinct
+    name and job is lowercased once and the keys are paired with the items
+    up front, so the sorts compare plain tuples via itemgetter.
+    """
+    lc = {}
+
+    def lower(s):
+        v = lc.get(s)
+        if v is None:
+            v = lc[s] = s.lower()
+        return v
+
+    key0 = itemgetter(0)
+    emps = sorted(((lower(d[0]), (k, d)) for k, d in by_emp.items()), key=key0)
+    ejs = sorted((((lower(d[0]), lower(k[1])), (k, d)) for k, d in by_emp_job.items()),
+                 key=key0)
+    jobs = sorted(((lower(k), (k, d)) for k, d in by_job.items()), key=key0)
+    return [e[1] for e in emps], [e[1] for e in ejs], [j[1] for j in jobs]
+
+
 def _pdf_table_header(pdf, headers, widths, color_rgb):
     """Draw a table header row with colored fill."""
     pdf.set_fill_color(*color_rgb)
@@ -199,6 +532,42 @@ def _pdf_table_header(pdf, headers, widths, color_rgb):
     pdf.set_font("Helvetica", "", 8)
 
 
+def _pdf_table_row(pdf, cells, h=6):
+    """Draw one bordered table row from (width, text, align) tuples.
+
+    Each text is placed with pdf.text() at the offset pdf.cell() would
+    give it, and the grid is stroked as a single rectangle plus the inner
+    column rules. This skips cell()'s per-cell layout work, which
+    dominates long reports.
+    """
+    if pdf.will_page_break(h):
+        x = pdf.x
+        pdf.add_page(same=True)
+        pdf.x = x
+    cm = pdf.c_margin
+    text, string_width = pdf.text, pdf.get_string_width
+    x0 = x = pdf.x
+    y0 = pdf.y
+    y1 = y0 + h
+    baseline = y0 + 0.5 * h + 0.3 * pdf.font_size
+    for w, s, align in cells:
+        if s:
+            if align == "L":
+                dx = cm
+            else:
+                tw = string_width(s)
+                dx = w - cm - tw if align == "R" else (w - tw) / 2
+            text(x + dx, baseline, s)
+        x += w
+    pdf.rect(x0, y0, x - x0, h)
+    line = pdf.line
+    xr = x0
+    for w, _, _ in cells[:-1]:
+        xr += w
+        line(xr, y0, xr, y1)
+    pdf.set_xy(pdf.l_margin, y1)
+
+
 # ---------------------------------------------------------------------------
 # GPS distance calculation
 # ---------------------------------------------------------------------------
@@ -857,28 +1226,18 @@ def admin_export_download():
         flash("Token is required.", "error")
         return redirect(url_for("time_admin.admin_export"))
 
+    logos = _LOGO_POOL.submit(_resize_report_logos, token_str)
+
     entries = database.get_time_entries_for_export(
         token_str, date_from=date_from or None, date_to=date_to or None,
     )
     token_data = database.get_token(token_str)
     company = token_data["company_name"] if token_data else "Unknown"
 
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-    from openpyxl.worksheet.views import SheetView
-
     wb = Workbook()
     ws = wb.active
     ws.title = "Time Entries"
-
-    # Header styling
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    header_fill = PatternFill(start_color="2563EB", end_color="2563EB", fill_type="solid")
-    header_align = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    thin_border = Border(
-        left=Side(style="thin"), right=Side(style="thin"),
-        top=Side(style="thin"), bottom=Side(style="thin"),
-    )
+    _xl_add_named_styles(wb)
 
     headers = [
         "Employee Name", "Employee ID", "Job Name", "Job Address",
@@ -889,11 +1248,11 @@ def admin_export_download():
     ]
 
     for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_align
-        cell.border = thin_border
+        ws.cell(row=1, column=col, value=header).style = "header_blue"
+
+    # Column widths are tracked while writing, instead of re-reading every
+    # cell afterwards
+    widths = [len(h) for h in headers]
 
     for row_idx, e in enumerate(entries, 2):
         clock_in_gps = ""
@@ -922,133 +1281,80 @@ def admin_export_download():
         ]
 
         for col, value in enumerate(row_data, 1):
-            cell = ws.cell(row=row_idx, column=col, value=value)
-            cell.border = thin_border
-
-    # Auto-width columns
-    for col in ws.columns:
-        max_len = 0
-        col_letter = col[0].column_letter
-        for cell in col:
-            if cell.value:
-                max_len = max(max_len, len(str(cell.value)))
-        ws.column_dimensions[col_letter].width = min(max_len + 3, 40)
+            ws.cell(row=row_idx, column=col, value=value).style = "body"
+            if value:
+                n = len(str(value))
+                if n > widths[col - 1]:
+                    widths[col - 1] = n
+
+    for col, w in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(col)].width = min(w + 3, 40)
 
     # --- Employee Summary Section ---
     summary_start = len(entries) + 4  # 2 blank rows after data
-    summary_header_font = Font(bold=True, color="FFFFFF", size=11)
-    summary_fill = PatternFill(start_color="16A34A", end_color="16A34A", fill_type="solid")
-    bold_font = Font(bold=True, size=11)
 
-    ws.cell(row=summary_start - 1, column=1, value="Employee Summary").font = Font(bold=True, size=13)
+    ws.cell(row=summary_start - 1, column=1, value="Employee Summary").style = "section_title"
 
     sum_headers = ["Employee Name", "Employee ID", "Total Hours"]
     for col, h in enumerate(sum_headers, 1):
-        cell = ws.cell(row=summary_start, column=col, value=h)
-        cell.font = summary_header_font
-        cell.fill = summary_fill
-        cell.alignment = header_align
-        cell.border = thin_border
+        ws.cell(row=summary_start, column=col, value=h).style = "header_green"
 
-    emp_totals = defaultdict(lambda: {"name": "", "emp_id": "", "hours": 0.0})
-    for e in entries:
-        key = e.get("emp_id_str", "")
-        emp_totals[key]["name"] = e.get("employee_name", "")
-        emp_totals[key]["emp_id"] = key
-        emp_totals[key]["hours"] += float(e.get("total_hours") or 0)
-
-    sorted_emps = sorted(emp_totals.values(), key=lambda x: x["name"].lower())
+    sorted_emps, sorted_emp_jobs, sorted_jobs = _sort_report_groups(*_aggregate_hours(entries))
     company_total = 0.0
-    for i, emp in enumerate(sorted_emps):
+    for i, (emp_id, (name, hours)) in enumerate(sorted_emps):
         r = summary_start + 1 + i
-        ws.cell(row=r, column=1, value=emp["name"]).border = thin_border
-        ws.cell(row=r, column=2, value=emp["emp_id"]).border = thin_border
-        hrs_cell = ws.cell(row=r, column=3, value=round(emp["hours"], 2))
-        hrs_cell.border = thin_border
-        company_total += emp["hours"]
+        ws.cell(row=r, column=1, value=name).style = "body"
+        ws.cell(row=r, column=2, value=emp_id).style = "body"
+        ws.cell(row=r, column=3, value=round(hours, 2)).style = "body"
+        company_total += hours
 
     total_row = summary_start + 1 + len(sorted_emps)
-    ws.cell(row=total_row, column=1, value="Company Total").font = bold_font
-    ws.cell(row=total_row, column=1).border = thin_border
-    ws.cell(row=total_row, column=2).border = thin_border
-    total_cell = ws.cell(row=total_row, column=3, value=round(company_total, 2))
-    total_cell.font = bold_font
-    total_cell.border = thin_border
+    ws.cell(row=total_row, column=1, value="Company Total").style = "bold"
+    ws.cell(row=total_row, column=2).style = "body"
+    ws.cell(row=total_row, column=3, value=round(company_total, 2)).style = "bold"
 
     # --- Employee Hours by Job Section ---
     emp_job_start = total_row + 3  # 2 blank rows after Company Total
-    emp_job_fill = PatternFill(start_color="EA580C", end_color="EA580C", fill_type="solid")
 
-    ws.cell(row=emp_job_start - 1, column=1, value="Employee Hours by Job").font = Font(bold=True, size=13)
+    ws.cell(row=emp_job_start - 1, column=1, value="Employee Hours by Job").style = "section_title"
 
     ej_headers = ["Employee Name", "Employee ID", "Job Name", "Hours"]
     for col, h in enumerate(ej_headers, 1):
-        cell = ws.cell(row=emp_job_start, column=col, value=h)
-        cell.font = summary_header_font
-        cell.fill = emp_job_fill
-        cell.alignment = header_align
-        cell.border = thin_border
+        ws.cell(row=emp_job_start, column=col, value=h).style = "header_orange"
 
-    emp_job_totals = defaultdict(lambda: {"name": "", "emp_id": "", "job": "", "hours": 0.0})
-    for e in entries:
-        key = (e.get("emp_id_str", ""), e.get("job_name", ""))
-        emp_job_totals[key]["name"] = e.get("employee_name", "")
-        emp_job_totals[key]["emp_id"] = e.get("emp_id_str", "")
-        emp_job_totals[key]["job"] = e.get("job_name", "")
-        emp_job_totals[key]["hours"] += float(e.get("total_hours") or 0)
-
-    sorted_emp_jobs = sorted(emp_job_totals.values(), key=lambda x: (x["name"].lower(), x["job"].lower()))
-    for i, ej in enumerate(sorted_emp_jobs):
+    for i, ((emp_id, job_name), (name, hours)) in enumerate(sorted_emp_jobs):
         r = emp_job_start + 1 + i
-        ws.cell(row=r, column=1, value=ej["name"]).border = thin_border
-        ws.cell(row=r, column=2, value=ej["emp_id"]).border = thin_border
-        ws.cell(row=r, column=3, value=ej["job"]).border = thin_border
-        hrs_cell = ws.cell(row=r, column=4, value=round(ej["hours"], 2))
-        hrs_cell.border = thin_border
+        ws.cell(row=r, column=1, value=name).style = "body"
+        ws.cell(row=r, column=2, value=emp_id).style = "body"
+        ws.cell(row=r, column=3, value=job_name).style = "body"
+        ws.cell(row=r, column=4, value=round(hours, 2)).style = "body"
 
     # --- Company Hours by Job Section ---
     cj_start = emp_job_start + 1 + len(sorted_emp_jobs) + 2  # 2 blank rows
-    cj_fill = PatternFill(start_color="7C3AED", end_color="7C3AED", fill_type="solid")
 
-    ws.cell(row=cj_start - 1, column=1, value="Company Hours by Job").font = Font(bold=True, size=13)
+    ws.cell(row=cj_start - 1, column=1, value="Company Hours by Job").style = "section_title"
 
     cj_headers = ["Job Name", "Total Hours"]
     for col, h in enumerate(cj_headers, 1):
-        cell = ws.cell(row=cj_start, column=col, value=h)
-        cell.font = summary_header_font
-        cell.fill = cj_fill
-        cell.alignment = header_align
-        cell.border = thin_border
+        ws.cell(row=cj_start, column=col, value=h).style = "header_purple"
 
-    job_totals = defaultdict(float)
-    for e in entries:
-        job_totals[e.get("job_name", "")] += float(e.get("total_hours") or 0)
-
-    sorted_jobs = sorted(job_totals.items(), key=lambda x: x[0].lower())
     for i, (job_name, hours) in enumerate(sorted_jobs):
         r = cj_start + 1 + i
-        ws.cell(row=r, column=1, value=job_name).border = thin_border
-        hrs_cell = ws.cell(row=r, column=2, value=round(hours, 2))
-        hrs_cell.border = thin_border
+        ws.cell(row=r, column=1, value=job_name).style = "body"
+        ws.cell(row=r, column=2, value=round(hours, 2)).style = "body"
 
     cj_total_row = cj_start + 1 + len(sorted_jobs)
-    ws.cell(row=cj_total_row, column=1, value="Company Total").font = bold_font
-    ws.cell(row=cj_total_row, column=1).border = thin_border
-    cj_total_cell = ws.cell(row=cj_total_row, column=2, value=round(company_total, 2))
-    cj_total_cell.font = bold_font
-    cj_total_cell.border = thin_border
+    ws.cell(row=cj_total_row, column=1, value="Company Total").style = "bold"
+    ws.cell(row=cj_total_row, column=2, value=round(company_total, 2)).style = "bold"
 
     # Add logos
-    _xl_add_logos(ws, token_str, cj_total_row, logo_col="L")
+    _xl_add_logos(ws, logos.result(), cj_total_row, logo_col="L")
 
     # Set 140% zoom on ALL worksheets
     for sheet in wb.worksheets:
         sheet.sheet_view.zoomScale = 140
 
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
+    output = _xl_save(wb)
 
     date_range = ""
     if date_from:
@@ -1114,56 +1420,39 @@ def admin_export_download_pdf():
                   "Hours", "Status", "Notes"]
     _pdf_table_header(pdf, te_headers, col_widths, _SECTION_COLORS["blue"])
 
-    def _fmt_dt(val):
-        """Format ISO datetime to 'MM/DD h:MM AM/PM'."""
-        s = str(val or "")
-        if not s or s == "None":
-            return "\u2014"
-        try:
-            from datetime import datetime as _dt
-            dt = _dt.fromisoformat(s)
-            return dt.strftime("%m/%d %-I:%M %p")
-        except Exception:
-            return s[:16]
+    # Parse each clock-in/out string once up front, then format in a tight loop
+    clock_ins = [_fmt_dt(_parse_dt(e.get("clock_in_time"))) for e in entries]
+    clock_outs = [_fmt_dt(_parse_dt(e.get("clock_out_time"))) for e in entries]
 
+    table_row, safe = _pdf_table_row, _safe
     pdf.set_font("Helvetica", "", 7)
-    for e in entries:
+    for e, clock_in, clock_out in zip(entries, clock_ins, clock_outs):
         hours_val = float(e.get("total_hours") or 0)
         row = [
             str(e.get("employee_name", ""))[:24],
             str(e.get("emp_id_str", "")),
             str(e.get("job_name", ""))[:24],
-            _fmt_dt(e.get("clock_in_time")),
-            _fmt_dt(e.get("clock_out_time")),
+            clock_in,
+            clock_out,
             f"{hours_val:.2f}",
             str(e.get("status", "")),
             str(e.get("admin_notes", "") or ""),
         ]
-        for i, val in enumerate(row):
-            pdf.cell(col_widths[i], 6, _safe(val), border=1)
-        pdf.ln()
+        table_row(pdf, [(w, safe(val), "L") for w, val in zip(col_widths, row)])
 
     # Employee summary (green header)
     _pdf_section_header(pdf, "Employee Summary", _SECTION_COLORS["green"])
     sum_widths = [70, 50, 40]
     _pdf_table_header(pdf, ["Employee Name", "Employee ID", "Total Hours"], sum_widths, _SECTION_COLORS["green"])
 
-    emp_totals = defaultdict(lambda: {"name": "", "emp_id": "", "hours": 0.0})
-    for e in entries:
-        key = e.get("emp_id_str", "")
-        emp_totals[key]["name"] = e.get("employee_name", "")
-        emp_totals[key]["emp_id"] = key
-        emp_totals[key]["hours"] += float(e.get("total_hours") or 0)
-
-    sorted_emps = sorted(emp_totals.values(), key=lambda x: x["name"].lower())
+    sorted_emps, sorted_emp_jobs, sorted_jobs = _sort_report_groups(*_aggregate_hours(entries))
     company_total = 0.0
+    w0, w1, w2 = sum_widths
     pdf.set_font("Helvetica", "", 9)
-    for emp in sorted_emps:
-        pdf.cell(sum_widths[0], 6, _safe(emp["name"]), border=1)
-        pdf.cell(sum_widths[1], 6, _safe(emp["emp_id"]), border=1)
-        pdf.cell(sum_widths[2], 6, f"{emp['hours']:.2f}", border=1, align="R")
-        pdf.ln()
-        company_total += emp["hours"]
+    for emp_id, (name, hours) in sorted_emps:
+        table_row(pdf, [(w0, safe(name), "L"), (w1, safe(emp_id), "L"),
+                        (w2, f"{hours:.2f}", "R")])
+        company_total += hours
 
     pdf.set_font("Helvetica", "B", 9)
     pdf.cell(sum_widths[0] + sum_widths[1], 7, "Company Total", border=1)
@@ -1175,38 +1464,21 @@ def admin_export_download_pdf():
     ej_widths = [60, 40, 60, 30]
     _pdf_table_header(pdf, ["Employee Name", "Emp ID", "Job", "Hours"], ej_widths, _SECTION_COLORS["orange"])
 
-    emp_job_totals = defaultdict(lambda: {"name": "", "emp_id": "", "job": "", "hours": 0.0})
-    for e in entries:
-        key = (e.get("emp_id_str", ""), e.get("job_name", ""))
-        emp_job_totals[key]["name"] = e.get("employee_name", "")
-        emp_job_totals[key]["emp_id"] = e.get("emp_id_str", "")
-        emp_job_totals[key]["job"] = e.get("job_name", "")
-        emp_job_totals[key]["hours"] += float(e.get("total_hours") or 0)
-
-    sorted_emp_jobs = sorted(emp_job_totals.values(), key=lambda x: (x["name"].lower(), x["job"].lower()))
+    w0, w1, w2, w3 = ej_widths
     pdf.set_font("Helvetica", "", 9)
-    for ej in sorted_emp_jobs:
-        pdf.cell(ej_widths[0], 6, _safe(ej["name"]), border=1)
-        pdf.cell(ej_widths[1], 6, _safe(ej["emp_id"]), border=1)
-        pdf.cell(ej_widths[2], 6, _safe(ej["job"]), border=1)
-        pdf.cell(ej_widths[3], 6, f"{ej['hours']:.2f}", border=1, align="R")
-        pdf.ln()
+    for (emp_id, job_name), (name, hours) in sorted_emp_jobs:
+        table_row(pdf, [(w0, safe(name), "L"), (w1, safe(emp_id), "L"),
+                        (w2, safe(job_name), "L"), (w3, f"{hours:.2f}", "R")])
 
     # Company Hours by Job (purple header)
     _pdf_section_header(pdf, "Company Hours by Job", _SECTION_COLORS["purple"])
     cj_widths = [100, 40]
     _pdf_table_header(pdf, ["Job Name", "Total Hours"], cj_widths, _SECTION_COLORS["purple"])
 
-    job_totals = defaultdict(float)
-    for e in entries:
-        job_totals[e.get("job_name", "")] += float(e.get("total_hours") or 0)
-
-    sorted_jobs = sorted(job_totals.items(), key=lambda x: x[0].lower())
+    w0, w1 = cj_widths
     pdf.set_font("Helvetica", "", 9)
     for job_name, hours in sorted_jobs:
-        pdf.cell(cj_widths[0], 6, _safe(job_name), border=1)
-        pdf.cell(cj_widths[1], 6, f"{hours:.2f}", border=1, align="R")
-        pdf.ln()
+        table_row(pdf, [(w0, safe(job_name), "L"), (w1, f"{hours:.2f}", "R")])
 
     pdf.set_font("Helvetica", "B", 9)
     pdf.cell(cj_widths[0], 7, "Company Total", border=1)
@@ -1226,10 +1498,6 @@ def admin_export_download_pdf():
     # BDB logo footer
     _pdf_add_bdb_footer(pdf)
 
-    output = BytesIO()
-    pdf.output(output)
-    output.seek(0)
-
     date_range = ""
     if date_from:
         date_range += f"_{date_from}"
@@ -1237,10 +1505,7 @@ def admin_export_download_pdf():
         date_range += f"_to_{date_to}"
     filename = f"timekeeper_{company.replace(' ', '_')}{date_range}.pdf"
 
-    return send_file(
-        output, as_attachment=True, download_name=filename,
-        mimetype="application/pdf",
-    )
+    return _pdf_send(pdf, filename)
 
 
 # ---------------------------------------------------------------------------
@@ -1262,319 +1527,168 @@ def admin_export_payroll_cost():
         flash("Token is required.", "error")
         return redirect(url_for("time_admin.admin_export"))
 
-    entries = database.get_time_entries_for_export(
+    logos = _LOGO_POOL.submit(_resize_report_logos, token_str)
+
+    # Aggregated in a single pass, so rows are streamed from the cursor
+    entries = database.iter_time_entries_for_export(
         token_str, date_from=date_from or None, date_to=date_to or None,
     )
     token_data = database.get_token(token_str)
     company = token_data["company_name"] if token_data else "Unknown"
     burden_pct = token_data.get("labor_burden_pct", 0) if token_data else 0
-
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+    burden_mul = (burden_pct or 0) / 100.0
 
     wb = Workbook()
     ws = wb.active
     ws.title = "Payroll Cost Report"
+    _xl_add_named_styles(wb)
 
-    header_align = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    thin_border = Border(
-        left=Side(style="thin"), right=Side(style="thin"),
-        top=Side(style="thin"), bottom=Side(style="thin"),
-    )
-    bold_font = Font(bold=True, size=11)
-    money_fmt = '#,##0.00'
+    # Rows are staged first so column widths come from the values
+    # themselves rather than a scan of the finished sheet.
+    rows = []
 
     # Title rows
-    ws.cell(row=1, column=1, value=f"PAYROLL COST ESTIMATE — {company}").font = Font(bold=True, size=14)
-    ws.cell(row=2, column=1, value="NOT FOR BOOKKEEPING PURPOSES — Estimate Only").font = Font(bold=True, size=11, color="DC2626")
     range_label = ""
     if date_from:
         range_label += date_from
     if date_to:
         range_label += f" to {date_to}"
-    ws.cell(row=3, column=1, value=f"Date range: {range_label}").font = Font(size=10, color="6B7280")
-    ws.cell(row=4, column=1, value=f"Labor burden: {burden_pct}%").font = Font(size=10, color="6B7280")
+    rows.append([_xl_cell(ws, f"PAYROLL COST ESTIMATE — {company}", "title")])
+    rows.append([_xl_cell(ws, "NOT FOR BOOKKEEPING PURPOSES — Estimate Only", "warning")])
+    rows.append([_xl_cell(ws, f"Date range: {range_label}", "note")])
+    rows.append([_xl_cell(ws, f"Labor burden: {burden_pct}%", "note")])
+    rows.append([])
 
     # Pre-compute OT effective rates for all entries
-    eff_rates = database.get_effective_rates_for_entries(token_str, entries)
-
-    def _entry_base_pay(e):
-        """Return OT-adjusted base pay for a single time entry."""
-        hrs = float(e.get("total_hours") or 0)
-        if hrs <= 0 or e.get("hourly_wage") is None:
-            return 0.0
-        week = database._get_week_start_sunday(e["clock_in_time"])
-        rate_info = eff_rates.get((e["employee_id"], week))
-        if rate_info and rate_info["effective_rate"]:
-            return hrs * rate_info["effective_rate"]
-        return hrs * e["hourly_wage"]
+    eff_rates = database.get_effective_rates_for_export(
+        token_str, date_from=date_from or None, date_to=date_to or None,
+    )
 
-    # --- Section 1: Employee Cost Summary ---
-    s1_start = 6
-    s1_fill = PatternFill(start_color="16A34A", end_color="16A34A", fill_type="solid")
-    s1_font = Font(bold=True, color="FFFFFF", size=11)
-    ws.cell(row=s1_start, column=1, value="Employee Cost Summary").font = Font(bold=True, size=13)
-    s1_start += 1
+    emp_data, ej_data, job_data, date_data = _aggregate_payroll(
+        _iter_base_pay(entries, eff_rates), burden_mul,
+    )
 
+    # --- Section 1: Employee Cost Summary ---
+    rows.append([_xl_cell(ws, "Employee Cost Summary", "section_title")])
     s1_headers = ["Employee Name", "Employee ID", "Hours", "Rate", "Base Pay",
                   f"Burden ({burden_pct}%)", "Total Cost"]
-    for col, h in enumerate(s1_headers, 1):
-        cell = ws.cell(row=s1_start, column=col, value=h)
-        cell.font = s1_font
-        cell.fill = s1_fill
-        cell.alignment = header_align
-        cell.border = thin_border
-
-    # Aggregate by employee (with OT-adjusted pay)
-    emp_data = defaultdict(lambda: {"name": "", "emp_id": "", "hours": 0.0, "base": 0.0, "wage": None})
-    for e in entries:
-        key = e.get("emp_id_str", "")
-        emp_data[key]["name"] = e.get("employee_name", "")
-        emp_data[key]["emp_id"] = key
-        emp_data[key]["hours"] += float(e.get("total_hours") or 0)
-        emp_data[key]["base"] += _entry_base_pay(e)
-        if e.get("hourly_wage") is not None:
-            emp_data[key]["wage"] = e["hourly_wage"]
-
-    sorted_emps = sorted(emp_data.values(), key=lambda x: x["name"].lower())
+    rows.append([_xl_cell(ws, h, "header_green") for h in s1_headers])
+
+    sorted_emps, sorted_ej, sorted_jobs = _sort_report_groups(emp_data, ej_data, job_data)
     total_hours = 0.0
     total_base = 0.0
     total_burden = 0.0
     total_cost = 0.0
 
-    for i, emp in enumerate(sorted_emps):
-        r = s1_start + 1 + i
-        hours = round(emp["hours"], 2)
+    for emp_id, (name, hours, base, wage) in sorted_emps:
+        hours = round(hours, 2)
         total_hours += hours
-        ws.cell(row=r, column=1, value=emp["name"]).border = thin_border
-        ws.cell(row=r, column=2, value=emp["emp_id"]).border = thin_border
-        c_hrs = ws.cell(row=r, column=3, value=hours)
-        c_hrs.border = thin_border
-
-        if emp["wage"] is not None:
-            wage = emp["wage"]
-            base = round(emp["base"], 2)
-            burd = round(base * (burden_pct / 100), 2)
+        row = [_xl_cell(ws, name), _xl_cell(ws, emp_id), _xl_cell(ws, hours)]
+        if wage is not None:
+            base = round(base, 2)
+            burd = round(base * burden_mul, 2)
             cost = round(base + burd, 2)
             total_base += base
             total_burden += burd
             total_cost += cost
-            ws.cell(row=r, column=4, value=wage).border = thin_border
-            ws.cell(row=r, column=4).number_format = money_fmt
-            ws.cell(row=r, column=5, value=base).border = thin_border
-            ws.cell(row=r, column=5).number_format = money_fmt
-            ws.cell(row=r, column=6, value=burd).border = thin_border
-            ws.cell(row=r, column=6).number_format = money_fmt
-            ws.cell(row=r, column=7, value=cost).border = thin_border
-            ws.cell(row=r, column=7).number_format = money_fmt
+            row += [_xl_cell(ws, v, "money") for v in (wage, base, burd, cost)]
         else:
-            for c in range(4, 8):
-                ws.cell(row=r, column=c, value="—").border = thin_border
-
-    tr = s1_start + 1 + len(sorted_emps)
-    ws.cell(row=tr, column=1, value="Company Total").font = bold_font
-    ws.cell(row=tr, column=1).border = thin_border
-    ws.cell(row=tr, column=2).border = thin_border
-    ws.cell(row=tr, column=3, value=round(total_hours, 2)).font = bold_font
-    ws.cell(row=tr, column=3).border = thin_border
-    ws.cell(row=tr, column=4).border = thin_border
-    ws.cell(row=tr, column=5, value=round(total_base, 2)).font = bold_font
-    ws.cell(row=tr, column=5).border = thin_border
-    ws.cell(row=tr, column=5).number_format = money_fmt
-    ws.cell(row=tr, column=6, value=round(total_burden, 2)).font = bold_font
-    ws.cell(row=tr, column=6).border = thin_border
-    ws.cell(row=tr, column=6).number_format = money_fmt
-    ws.cell(row=tr, column=7, value=round(total_cost, 2)).font = bold_font
-    ws.cell(row=tr, column=7).border = thin_border
-    ws.cell(row=tr, column=7).number_format = money_fmt
+            row += [_xl_cell(ws, "—") for _ in range(4)]
+        rows.append(row)
+
+    rows.append([
+        _xl_cell(ws, "Company Total", "bold"), _xl_cell(ws),
+        _xl_cell(ws, round(total_hours, 2), "bold"), _xl_cell(ws),
+        _xl_cell(ws, round(total_base, 2), "bold_money"),
+        _xl_cell(ws, round(total_burden, 2), "bold_money"),
+        _xl_cell(ws, round(total_cost, 2), "bold_money"),
+    ])
+    rows.append([])
 
     # --- Section 2: Employee Cost by Job ---
-    s2_start = tr + 3
-    s2_fill = PatternFill(start_color="EA580C", end_color="EA580C", fill_type="solid")
-    ws.cell(row=s2_start - 1, column=1, value="Employee Cost by Job").font = Font(bold=True, size=13)
+    rows.append([_xl_cell(ws, "Employee Cost by Job", "section_title")])
     s2_headers = ["Employee Name", "Employee ID", "Job", "Hours", "Rate",
                   "Base Pay", "Burden", "Total Cost"]
-    for col, h in enumerate(s2_headers, 1):
-        cell = ws.cell(row=s2_start, column=col, value=h)
-        cell.font = s1_font
-        cell.fill = s2_fill
-        cell.alignment = header_align
-        cell.border = thin_border
-
-    ej_data = defaultdict(lambda: {"name": "", "emp_id": "", "job": "", "hours": 0.0, "base": 0.0, "wage": None})
-    for e in entries:
-        key = (e.get("emp_id_str", ""), e.get("job_name", ""))
-        ej_data[key]["name"] = e.get("employee_name", "")
-        ej_data[key]["emp_id"] = e.get("emp_id_str", "")
-        ej_data[key]["job"] = e.get("job_name", "")
-        ej_data[key]["hours"] += float(e.get("total_hours") or 0)
-        ej_data[key]["base"] += _entry_base_pay(e)
-        if e.get("hourly_wage") is not None:
-            ej_data[key]["wage"] = e["hourly_wage"]
-
-    sorted_ej = sorted(ej_data.values(), key=lambda x: (x["name"].lower(), x["job"].lower()))
-    for i, ej in enumerate(sorted_ej):
-        r = s2_start + 1 + i
-        hours = round(ej["hours"], 2)
-        ws.cell(row=r, column=1, value=ej["name"]).border = thin_border
-        ws.cell(row=r, column=2, value=ej["emp_id"]).border = thin_border
-        ws.cell(row=r, column=3, value=ej["job"]).border = thin_border
-        ws.cell(row=r, column=4, value=hours).border = thin_border
-        if ej["wage"] is not None:
-            wage = ej["wage"]
-            base = round(ej["base"], 2)
-            burd = round(base * (burden_pct / 100), 2)
+    rows.append([_xl_cell(ws, h, "header_orange") for h in s2_headers])
+
+    for (emp_id, job_name), (name, hours, base, wage) in sorted_ej:
+        hours = round(hours, 2)
+        row = [_xl_cell(ws, name), _xl_cell(ws, emp_id),
+               _xl_cell(ws, job_name), _xl_cell(ws, hours)]
+        if wage is not None:
+            base = round(base, 2)
+            burd = round(base * burden_mul, 2)
             cost = round(base + burd, 2)
-            ws.cell(row=r, column=5, value=wage).border = thin_border
-            ws.cell(row=r, column=5).number_format = money_fmt
-            ws.cell(row=r, column=6, value=base).border = thin_border
-            ws.cell(row=r, column=6).number_format = money_fmt
-            ws.cell(row=r, column=7, value=burd).border = thin_border
-            ws.cell(row=r, column=7).number_format = money_fmt
-            ws.cell(row=r, column=8, value=cost).border = thin_border
-            ws.cell(row=r, column=8).number_format = money_fmt
+            row += [_xl_cell(ws, v, "money") for v in (wage, base, burd, cost)]
         else:
-            for c in range(5, 9):
-                ws.cell(row=r, column=c, value="—").border = thin_border
+            row += [_xl_cell(ws, "—") for _ in range(4)]
+        rows.append(row)
+    rows.append([])
 
     # --- Section 3: Company Cost by Job ---
-    s3_start = s2_start + 1 + len(sorted_ej) + 2
-    s3_fill = PatternFill(start_color="7C3AED", end_color="7C3AED", fill_type="solid")
-    ws.cell(row=s3_start - 1, column=1, value="Company Cost by Job").font = Font(bold=True, size=13)
+    rows.append([_xl_cell(ws, "Company Cost by Job", "section_title")])
     s3_headers = ["Job", "Hours", "Base Pay", "Burden", "Total Cost"]
-    for col, h in enumerate(s3_headers, 1):
-        cell = ws.cell(row=s3_start, column=col, value=h)
-        cell.font = s1_font
-        cell.fill = s3_fill
-        cell.alignment = header_align
-        cell.border = thin_border
-
-    job_data = defaultdict(lambda: {"hours": 0.0, "base": 0.0, "burden": 0.0, "cost": 0.0})
-    for e in entries:
-        jn = e.get("job_name", "")
-        hours = float(e.get("total_hours") or 0)
-        job_data[jn]["hours"] += hours
-        base = _entry_base_pay(e)
-        if base > 0:
-            burd = base * (burden_pct / 100)
-            job_data[jn]["base"] += base
-            job_data[jn]["burden"] += burd
-            job_data[jn]["cost"] += base + burd
-
-    sorted_jobs = sorted(job_data.items(), key=lambda x: x[0].lower())
+    rows.append([_xl_cell(ws, h, "header_purple") for h in s3_headers])
+
     jt_hours = jt_base = jt_burden = jt_cost = 0.0
-    for i, (jname, jd) in enumerate(sorted_jobs):
-        r = s3_start + 1 + i
-        hrs = round(jd["hours"], 2)
-        base = round(jd["base"], 2)
-        burd = round(jd["burden"], 2)
-        cost = round(jd["cost"], 2)
+    for jname, (hrs, base, burd, cost) in sorted_jobs:
+        hrs = round(hrs, 2)
+        base = round(base, 2)
+        burd = round(burd, 2)
+        cost = round(cost, 2)
         jt_hours += hrs
         jt_base += base
         jt_burden += burd
         jt_cost += cost
-        ws.cell(row=r, column=1, value=jname).border = thin_border
-        ws.cell(row=r, column=2, value=hrs).border = thin_border
-        ws.cell(row=r, column=3, value=base).border = thin_border
-        ws.cell(row=r, column=3).number_format = money_fmt
-        ws.cell(row=r, column=4, value=burd).border = thin_border
-        ws.cell(row=r, column=4).number_format = money_fmt
-        ws.cell(row=r, column=5, value=cost).border = thin_border
-        ws.cell(row=r, column=5).number_format = money_fmt
-
-    jtr = s3_start + 1 + len(sorted_jobs)
-    ws.cell(row=jtr, column=1, value="Company Total").font = bold_font
-    ws.cell(row=jtr, column=1).border = thin_border
-    ws.cell(row=jtr, column=2, value=round(jt_hours, 2)).font = bold_font
-    ws.cell(row=jtr, column=2).border = thin_border
-    ws.cell(row=jtr, column=3, value=round(jt_base, 2)).font = bold_font
-    ws.cell(row=jtr, column=3).border = thin_border
-    ws.cell(row=jtr, column=3).number_format = money_fmt
-    ws.cell(row=jtr, column=4, value=round(jt_burden, 2)).font = bold_font
-    ws.cell(row=jtr, column=4).border = thin_border
-    ws.cell(row=jtr, column=4).number_format = money_fmt
-    ws.cell(row=jtr, column=5, value=round(jt_cost, 2)).font = bold_font
-    ws.cell(row=jtr, column=5).border = thin_border
-    ws.cell(row=jtr, column=5).number_format = money_fmt
+        rows.append([_xl_cell(ws, jname), _xl_cell(ws, hrs)]
+                    + [_xl_cell(ws, v, "money") for v in (base, burd, cost)])
+
+    rows.append([
+        _xl_cell(ws, "Company Total", "bold"), _xl_cell(ws, round(jt_hours, 2), "bold"),
+        _xl_cell(ws, round(jt_base, 2), "bold_money"),
+        _xl_cell(ws, round(jt_burden, 2), "bold_money"),
+        _xl_cell(ws, round(jt_cost, 2), "bold_money"),
+    ])
+    rows.append([])
 
     # --- Section 4: Company Cost by Date ---
-    s4_start = jtr + 3
-    s4_fill = PatternFill(start_color="2563EB", end_color="2563EB", fill_type="solid")
-    ws.cell(row=s4_start - 1, column=1, value="Company Cost by Date").font = Font(bold=True, size=13)
+    rows.append([_xl_cell(ws, "Company Cost by Date", "section_title")])
     s4_headers = ["Date", "Hours", "Base Pay", "Burden", "Total Cost"]
-    for col, h in enumerate(s4_headers, 1):
-        cell = ws.cell(row=s4_start, column=col, value=h)
-        cell.font = s1_font
-        cell.fill = s4_fill
-        cell.alignment = header_align
-        cell.border = thin_border
-
-    date_data = defaultdict(lambda: {"hours": 0.0, "base": 0.0, "burden": 0.0, "cost": 0.0})
-    for e in entries:
-        dt = (e.get("clock_in_time") or "")[:10]
-        hours = float(e.get("total_hours") or 0)
-        date_data[dt]["hours"] += hours
-        base = _entry_base_pay(e)
-        if base > 0:
-            burd = base * (burden_pct / 100)
-            date_data[dt]["base"] += base
-            date_data[dt]["burden"] += burd
-            date_data[dt]["cost"] += base + burd
+    rows.append([_xl_cell(ws, h, "header_blue") for h in s4_headers])
 
     sorted_dates = sorted(date_data.items())
     dt_hours = dt_base = dt_burden = dt_cost = 0.0
-    for i, (dt, dd) in enumerate(sorted_dates):
-        r = s4_start + 1 + i
-        hrs = round(dd["hours"], 2)
-        base = round(dd["base"], 2)
-        burd = round(dd["burden"], 2)
-        cost = round(dd["cost"], 2)
+    for dt, (hrs, base, burd, cost) in sorted_dates:
+        hrs = round(hrs, 2)
+        base = round(base, 2)
+        burd = round(burd, 2)
+        cost = round(cost, 2)
         dt_hours += hrs
         dt_base += base
         dt_burden += burd
         dt_cost += cost
-        ws.cell(row=r, column=1, value=dt).border = thin_border
-        ws.cell(row=r, column=2, value=hrs).border = thin_border
-        ws.cell(row=r, column=3, value=base).border = thin_border
-        ws.cell(row=r, column=3).number_format = money_fmt
-        ws.cell(row=r, column=4, value=burd).border = thin_border
-        ws.cell(row=r, column=4).number_format = money_fmt
-        ws.cell(row=r, column=5, value=cost).border = thin_border
-        ws.cell(row=r, column=5).number_format = money_fmt
-
-    dtr = s4_start + 1 + len(sorted_dates)
-    ws.cell(row=dtr, column=1, value="Company Total").font = bold_font
-    ws.cell(row=dtr, column=1).border = thin_border
-    ws.cell(row=dtr, column=2, value=round(dt_hours, 2)).font = bold_font
-    ws.cell(row=dtr, column=2).border = thin_border
-    ws.cell(row=dtr, column=3, value=round(dt_base, 2)).font = bold_font
-    ws.cell(row=dtr, column=3).border = thin_border
-    ws.cell(row=dtr, column=3).number_format = money_fmt
-    ws.cell(row=dtr, column=4, value=round(dt_burden, 2)).font = bold_font
-    ws.cell(row=dtr, column=4).border = thin_border
-    ws.cell(row=dtr, column=4).number_format = money_fmt
-    ws.cell(row=dtr, column=5, value=round(dt_cost, 2)).font = bold_font
-    ws.cell(row=dtr, column=5).border = thin_border
-    ws.cell(row=dtr, column=5).number_format = money_fmt
+        rows.append([_xl_cell(ws, dt), _xl_cell(ws, hrs)]
+                    + [_xl_cell(ws, v, "money") for v in (base, burd, cost)])
 
-    # Add logos
-    _xl_add_logos(ws, token_str, dtr)
+    rows.append([
+        _xl_cell(ws, "Company Total", "bold"), _xl_cell(ws, round(dt_hours, 2), "bold"),
+        _xl_cell(ws, round(dt_base, 2), "bold_money"),
+        _xl_cell(ws, round(dt_burden, 2), "bold_money"),
+        _xl_cell(ws, round(dt_cost, 2), "bold_money"),
+    ])
+    dtr = len(rows)
+
+    _xl_set_column_widths(ws, rows)
+    for row in rows:
+        ws.append(row)
 
-    # Auto-width columns
-    for col in ws.columns:
-        max_len = 0
-        col_letter = col[0].column_letter
-        for cell in col:
-            if cell.value:
-                max_len = max(max_len, len(str(cell.value)))
-        ws.column_dimensions[col_letter].width = min(max_len + 3, 40)
+    # Add logos
+    _xl_add_logos(ws, logos.result(), dtr)
 
     for sheet in wb.worksheets:
         sheet.sheet_view.zoomScale = 140
 
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
+    output = _xl_save(wb)
 
     date_range = ""
     if date_from:
@@ -1593,326 +1707,179 @@ def admin_export_payroll_cost():
 # Combined Export (Hours + Payroll Cost)
 # ---------------------------------------------------------------------------
 
-@time_admin_bp.route("/admin/export/combined")
-@login_required
-def admin_export_combined():
-    _app = _helpers()
-    token_str = request.args.get("token", "")
-    if not current_user.is_bdb:
-        token_str = current_user.token
-    date_from = request.args.get("date_from", "")
-    date_to = request.args.get("date_to", "")
-    _app._verify_token_access(token_str)
+@lru_cache(maxsize=32)
+def _build_combined_xlsx(token_str, date_from, date_to, fingerprint):
+    """Build the combined XLSX report; returns (xlsx bytes, filename).
 
-    if not token_str:
-        flash("Token is required.", "error")
-        return redirect(url_for("time_admin.admin_export"))
+    ``fingerprint`` comes from database.get_export_fingerprint() and is
+    only part of the cache key: any change to the token's entries,
+    employees, jobs or settings yields a new key and a fresh report.
+    """
+    logos = _LOGO_POOL.submit(_resize_report_logos, token_str)
 
-    entries = database.get_time_entries_for_export(
+    # Aggregated in a single pass, so rows are streamed from the cursor
+    entries = database.iter_time_entries_for_export(
         token_str, date_from=date_from or None, date_to=date_to or None,
     )
     token_data = database.get_token(token_str)
     company = token_data["company_name"] if token_data else "Unknown"
     burden_pct = token_data.get("labor_burden_pct", 0) if token_data else 0
+    burden_mul = (burden_pct or 0) / 100.0
 
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+    # Write-only mode streams rows straight to the sheet XML instead of
+    # holding a Cell grid in memory until save. Rows can only be appended,
+    # so everything is aggregated first and column widths / sheet view are
+    # set before the first append.
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Combined Report")
+    _xl_add_named_styles(wb)
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Combined Report"
-
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    header_align = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    thin_border = Border(
-        left=Side(style="thin"), right=Side(style="thin"),
-        top=Side(style="thin"), bottom=Side(style="thin"),
-    )
-    bold_font = Font(bold=True, size=11)
-    money_fmt = '#,##0.00'
+    rows = []
 
     # Disclaimer rows
-    ws.cell(row=1, column=1, value=f"COMBINED HOURS & PAYROLL REPORT — {company}").font = Font(bold=True, size=14)
-    ws.cell(row=2, column=1, value="NOT FOR BOOKKEEPING PURPOSES — Estimate Only").font = Font(bold=True, size=11, color="DC2626")
     range_label = ""
     if date_from:
         range_label += date_from
     if date_to:
         range_label += f" to {date_to}"
-    ws.cell(row=3, column=1, value=f"Date range: {range_label}  |  Labor burden: {burden_pct}%").font = Font(size=10, color="6B7280")
+    rows.append([_xl_cell(ws, f"COMBINED HOURS & PAYROLL REPORT — {company}", "title")])
+    rows.append([_xl_cell(ws, "NOT FOR BOOKKEEPING PURPOSES — Estimate Only", "warning")])
+    rows.append([_xl_cell(ws, f"Date range: {range_label}  |  Labor burden: {burden_pct}%", "note")])
+    rows.append([])
 
     # Pre-compute OT effective rates for all entries
-    eff_rates = database.get_effective_rates_for_entries(token_str, entries)
-
-    def _entry_base_pay(e):
-        """Return OT-adjusted base pay for a single time entry."""
-        hrs = float(e.get("total_hours") or 0)
-        if hrs <= 0 or e.get("hourly_wage") is None:
-            return 0.0
-        week = database._get_week_start_sunday(e["clock_in_time"])
-        rate_info = eff_rates.get((e["employee_id"], week))
-        if rate_info and rate_info["effective_rate"]:
-            return hrs * rate_info["effective_rate"]
-        return hrs * e["hourly_wage"]
+    eff_rates = database.get_effective_rates_for_export(
+        token_str, date_from=date_from or None, date_to=date_to or None,
+    )
 
-    # --- Section 1: Employee Summary (green) ---
-    s1_start = 5
-    s1_fill = PatternFill(start_color="16A34A", end_color="16A34A", fill_type="solid")
-    ws.cell(row=s1_start, column=1, value="Employee Summary").font = Font(bold=True, size=13)
-    s1_start += 1
+    # Single pass over entries feeding all four sections: OT-adjusted base
+    # pay, burden and cost are computed once per entry and fanned out.
+    emp_data, ej_data, job_data, date_data = _aggregate_payroll(
+        _iter_base_pay(entries, eff_rates), burden_mul,
+    )
+
+    # Each section's aggregate is dropped once its rows are staged, so the
+    # raw entries and all four dicts are never alive alongside the cells.
+    del entries, eff_rates
 
+    # --- Section 1: Employee Summary (green) ---
+    rows.append([_xl_cell(ws, "Employee Summary", "section_title")])
     s1_headers = ["Employee Name", "Employee ID", "Total Hours", "Rate",
                   "Base Pay", f"Burden ({burden_pct}%)", "Total Cost"]
-    for col, h in enumerate(s1_headers, 1):
-        cell = ws.cell(row=s1_start, column=col, value=h)
-        cell.font = header_font
-        cell.fill = s1_fill
-        cell.alignment = header_align
-        cell.border = thin_border
-
-    emp_data = defaultdict(lambda: {"name": "", "emp_id": "", "hours": 0.0, "base": 0.0, "wage": None})
-    for e in entries:
-        key = e.get("emp_id_str", "")
-        emp_data[key]["name"] = e.get("employee_name", "")
-        emp_data[key]["emp_id"] = key
-        emp_data[key]["hours"] += float(e.get("total_hours") or 0)
-        emp_data[key]["base"] += _entry_base_pay(e)
-        if e.get("hourly_wage") is not None:
-            emp_data[key]["wage"] = e["hourly_wage"]
-
-    sorted_emps = sorted(emp_data.values(), key=lambda x: x["name"].lower())
+    rows.append([_xl_cell(ws, h, "header_green") for h in s1_headers])
+
+    sorted_emps, sorted_ej, sorted_jobs = _sort_report_groups(emp_data, ej_data, job_data)
     company_hours = company_base = company_burden = company_cost = 0.0
 
-    for i, emp in enumerate(sorted_emps):
-        r = s1_start + 1 + i
-        hours = round(emp["hours"], 2)
+    for emp_id, (name, hours, base, wage) in sorted_emps:
+        hours = round(hours, 2)
         company_hours += hours
-        ws.cell(row=r, column=1, value=emp["name"]).border = thin_border
-        ws.cell(row=r, column=2, value=emp["emp_id"]).border = thin_border
-        ws.cell(row=r, column=3, value=hours).border = thin_border
-        if emp["wage"] is not None:
-            wage = emp["wage"]
-            base = round(emp["base"], 2)
-            burd = round(base * (burden_pct / 100), 2)
+        row = [_xl_cell(ws, name), _xl_cell(ws, emp_id), _xl_cell(ws, hours)]
+        if wage is not None:
+            base = round(base, 2)
+            burd = round(base * burden_mul, 2)
             cost = round(base + burd, 2)
             company_base += base
             company_burden += burd
             company_cost += cost
-            ws.cell(row=r, column=4, value=wage).border = thin_border
-            ws.cell(row=r, column=4).number_format = money_fmt
-            ws.cell(row=r, column=5, value=base).border = thin_border
-            ws.cell(row=r, column=5).number_format = money_fmt
-            ws.cell(row=r, column=6, value=burd).border = thin_border
-            ws.cell(row=r, column=6).number_format = money_fmt
-            ws.cell(row=r, column=7, value=cost).border = thin_border
-            ws.cell(row=r, column=7).number_format = money_fmt
+            row += [_xl_cell(ws, wage, "money"), _xl_cell(ws, base, "money"),
+                    _xl_cell(ws, burd, "money"), _xl_cell(ws, cost, "money")]
         else:
-            for c in range(4, 8):
-                ws.cell(row=r, column=c, value="—").border = thin_border
-
-    tr = s1_start + 1 + len(sorted_emps)
-    ws.cell(row=tr, column=1, value="Company Total").font = bold_font
-    ws.cell(row=tr, column=1).border = thin_border
-    ws.cell(row=tr, column=2).border = thin_border
-    ws.cell(row=tr, column=3, value=round(company_hours, 2)).font = bold_font
-    ws.cell(row=tr, column=3).border = thin_border
-    ws.cell(row=tr, column=4).border = thin_border
-    ws.cell(row=tr, column=5, value=round(company_base, 2)).font = bold_font
-    ws.cell(row=tr, column=5).border = thin_border
-    ws.cell(row=tr, column=5).number_format = money_fmt
-    ws.cell(row=tr, column=6, value=round(company_burden, 2)).font = bold_font
-    ws.cell(row=tr, column=6).border = thin_border
-    ws.cell(row=tr, column=6).number_format = money_fmt
-    ws.cell(row=tr, column=7, value=round(company_cost, 2)).font = bold_font
-    ws.cell(row=tr, column=7).border = thin_border
-    ws.cell(row=tr, column=7).number_format = money_fmt
+            row += [_xl_cell(ws, "—") for _ in range(4)]
+        rows.append(row)
+
+    rows.append([
+        _xl_cell(ws, "Company Total", "bold"), _xl_cell(ws), _xl_cell(ws, round(company_hours, 2), "bold"), _xl_cell(ws),
+        _xl_cell(ws, round(company_base, 2), "bold_money"), _xl_cell(ws, round(company_burden, 2), "bold_money"),
+        _xl_cell(ws, round(company_cost, 2), "bold_money"),
+    ])
+    rows.append([])
+    del emp_data, sorted_emps
 
     # --- Section 2: Employee Hours by Job + Cost (orange) ---
-    s2_start = tr + 3
-    s2_fill = PatternFill(start_color="EA580C", end_color="EA580C", fill_type="solid")
-    ws.cell(row=s2_start - 1, column=1, value="Employee Hours by Job").font = Font(bold=True, size=13)
+    rows.append([_xl_cell(ws, "Employee Hours by Job", "section_title")])
     s2_headers = ["Employee Name", "Employee ID", "Job", "Hours", "Rate",
                   "Base Pay", "Burden", "Total Cost"]
-    for col, h in enumerate(s2_headers, 1):
-        cell = ws.cell(row=s2_start, column=col, value=h)
-        cell.font = header_font
-        cell.fill = s2_fill
-        cell.alignment = header_align
-        cell.border = thin_border
-
-    ej_data = defaultdict(lambda: {"name": "", "emp_id": "", "job": "", "hours": 0.0, "base": 0.0, "wage": None})
-    for e in entries:
-        key = (e.get("emp_id_str", ""), e.get("job_name", ""))
-        ej_data[key]["name"] = e.get("employee_name", "")
-        ej_data[key]["emp_id"] = e.get("emp_id_str", "")
-        ej_data[key]["job"] = e.get("job_name", "")
-        ej_data[key]["hours"] += float(e.get("total_hours") or 0)
-        ej_data[key]["base"] += _entry_base_pay(e)
-        if e.get("hourly_wage") is not None:
-            ej_data[key]["wage"] = e["hourly_wage"]
-
-    sorted_ej = sorted(ej_data.values(), key=lambda x: (x["name"].lower(), x["job"].lower()))
-    for i, ej in enumerate(sorted_ej):
-        r = s2_start + 1 + i
-        hours = round(ej["hours"], 2)
-        ws.cell(row=r, column=1, value=ej["name"]).border = thin_border
-        ws.cell(row=r, column=2, value=ej["emp_id"]).border = thin_border
-        ws.cell(row=r, column=3, value=ej["job"]).border = thin_border
-        ws.cell(row=r, column=4, value=hours).border = thin_border
-        if ej["wage"] is not None:
-            base = round(ej["base"], 2)
-            burd = round(base * (burden_pct / 100), 2)
+    rows.append([_xl_cell(ws, h, "header_orange") for h in s2_headers])
+
+    for (emp_id, job_name), (name, hours, base, wage) in sorted_ej:
+        row = [_xl_cell(ws, name), _xl_cell(ws, emp_id), _xl_cell(ws, job_name), _xl_cell(ws, round(hours, 2))]
+        if wage is not None:
+            base = round(base, 2)
+            burd = round(base * burden_mul, 2)
             cost = round(base + burd, 2)
-            ws.cell(row=r, column=5, value=ej["wage"]).border = thin_border
-            ws.cell(row=r, column=5).number_format = money_fmt
-            ws.cell(row=r, column=6, value=base).border = thin_border
-            ws.cell(row=r, column=6).number_format = money_fmt
-            ws.cell(row=r, column=7, value=burd).border = thin_border
-            ws.cell(row=r, column=7).number_format = money_fmt
-            ws.cell(row=r, column=8, value=cost).border = thin_border
-            ws.cell(row=r, column=8).number_format = money_fmt
+            row += [_xl_cell(ws, wage, "money"), _xl_cell(ws, base, "money"),
+                    _xl_cell(ws, burd, "money"), _xl_cell(ws, cost, "money")]
         else:
-            for c in range(5, 9):
-                ws.cell(row=r, column=c, value="—").border = thin_border
+            row += [_xl_cell(ws, "—") for _ in range(4)]
+        rows.append(row)
+    rows.append([])
+    del ej_data, sorted_ej
 
     # --- Section 3: Company Hours by Job + Cost (purple) ---
-    s3_start = s2_start + 1 + len(sorted_ej) + 2
-    s3_fill = PatternFill(start_color="7C3AED", end_color="7C3AED", fill_type="solid")
-    ws.cell(row=s3_start - 1, column=1, value="Company Hours by Job").font = Font(bold=True, size=13)
+    rows.append([_xl_cell(ws, "Company Hours by Job", "section_title")])
     s3_headers = ["Job", "Hours", "Base Pay", "Burden", "Total Cost"]
-    for col, h in enumerate(s3_headers, 1):
-        cell = ws.cell(row=s3_start, column=col, value=h)
-        cell.font = header_font
-        cell.fill = s3_fill
-        cell.alignment = header_align
-        cell.border = thin_border
-
-    job_data = defaultdict(lambda: {"hours": 0.0, "base": 0.0, "burden": 0.0, "cost": 0.0})
-    for e in entries:
-        jn = e.get("job_name", "")
-        hours = float(e.get("total_hours") or 0)
-        job_data[jn]["hours"] += hours
-        base = _entry_base_pay(e)
-        if base > 0:
-            burd = base * (burden_pct / 100)
-            job_data[jn]["base"] += base
-            job_data[jn]["burden"] += burd
-            job_data[jn]["cost"] += base + burd
-
-    sorted_jobs = sorted(job_data.items(), key=lambda x: x[0].lower())
+    rows.append([_xl_cell(ws, h, "header_purple") for h in s3_headers])
+
     jt_hours = jt_base = jt_burden = jt_cost = 0.0
-    for i, (jname, jd) in enumerate(sorted_jobs):
-        r = s3_start + 1 + i
-        hrs = round(jd["hours"], 2)
-        base = round(jd["base"], 2)
-        burd = round(jd["burden"], 2)
-        cost = round(jd["cost"], 2)
+    for jname, (hrs, base, burd, cost) in sorted_jobs:
+        hrs = round(hrs, 2)
+        base = round(base, 2)
+        burd = round(burd, 2)
+        cost = round(cost, 2)
         jt_hours += hrs
         jt_base += base
         jt_burden += burd
         jt_cost += cost
-        ws.cell(row=r, column=1, value=jname).border = thin_border
-        ws.cell(row=r, column=2, value=hrs).border = thin_border
-        ws.cell(row=r, column=3, value=base).border = thin_border
-        ws.cell(row=r, column=3).number_format = money_fmt
-        ws.cell(row=r, column=4, value=burd).border = thin_border
-        ws.cell(row=r, column=4).number_format = money_fmt
-        ws.cell(row=r, column=5, value=cost).border = thin_border
-        ws.cell(row=r, column=5).number_format = money_fmt
-
-    jtr = s3_start + 1 + len(sorted_jobs)
-    ws.cell(row=jtr, column=1, value="Company Total").font = bold_font
-    ws.cell(row=jtr, column=1).border = thin_border
-    ws.cell(row=jtr, column=2, value=round(jt_hours, 2)).font = bold_font
-    ws.cell(row=jtr, column=2).border = thin_border
-    ws.cell(row=jtr, column=3, value=round(jt_base, 2)).font = bold_font
-    ws.cell(row=jtr, column=3).border = thin_border
-    ws.cell(row=jtr, column=3).number_format = money_fmt
-    ws.cell(row=jtr, column=4, value=round(jt_burden, 2)).font = bold_font
-    ws.cell(row=jtr, column=4).border = thin_border
-    ws.cell(row=jtr, column=4).number_format = money_fmt
-    ws.cell(row=jtr, column=5, value=round(jt_cost, 2)).font = bold_font
-    ws.cell(row=jtr, column=5).border = thin_border
-    ws.cell(row=jtr, column=5).number_format = money_fmt
+        rows.append([_xl_cell(ws, jname), _xl_cell(ws, hrs), _xl_cell(ws, base, "money"),
+                     _xl_cell(ws, burd, "money"), _xl_cell(ws, cost, "money")])
+
+    rows.append([
+        _xl_cell(ws, "Company Total", "bold"), _xl_cell(ws, round(jt_hours, 2), "bold"),
+        _xl_cell(ws, round(jt_base, 2), "bold_money"), _xl_cell(ws, round(jt_burden, 2), "bold_money"),
+        _xl_cell(ws, round(jt_cost, 2), "bold_money"),
+    ])
+    rows.append([])
+    del job_data, sorted_jobs
 
     # --- Section 4: Company Cost by Date (blue) ---
-    s4_start = jtr + 3
-    s4_fill = PatternFill(start_color="2563EB", end_color="2563EB", fill_type="solid")
-    ws.cell(row=s4_start - 1, column=1, value="Company Cost by Date").font = Font(bold=True, size=13)
+    rows.append([_xl_cell(ws, "Company Cost by Date", "section_title")])
     s4_headers = ["Date", "Hours", "Base Pay", "Burden", "Total Cost"]
-    for col, h in enumerate(s4_headers, 1):
-        cell = ws.cell(row=s4_start, column=col, value=h)
-        cell.font = header_font
-        cell.fill = s4_fill
-        cell.alignment = header_align
-        cell.border = thin_border
-
-    date_data = defaultdict(lambda: {"hours": 0.0, "base": 0.0, "burden": 0.0, "cost": 0.0})
-    for e in entries:
-        dt = (e.get("clock_in_time") or "")[:10]
-        hours = float(e.get("total_hours") or 0)
-        date_data[dt]["hours"] += hours
-        base = _entry_base_pay(e)
-        if base > 0:
-            burd = base * (burden_pct / 100)
-            date_data[dt]["base"] += base
-            date_data[dt]["burden"] += burd
-            date_data[dt]["cost"] += base + burd
+    rows.append([_xl_cell(ws, h, "header_blue") for h in s4_headers])
 
     sorted_dates = sorted(date_data.items())
     dt_hours = dt_base = dt_burden = dt_cost = 0.0
-    for i, (dt, dd) in enumerate(sorted_dates):
-        r = s4_start + 1 + i
-        hrs = round(dd["hours"], 2)
-        base = round(dd["base"], 2)
-        burd = round(dd["burden"], 2)
-        cost = round(dd["cost"], 2)
+    for dt, (hrs, base, burd, cost) in sorted_dates:
+        hrs = round(hrs, 2)
+        base = round(base, 2)
+        burd = round(burd, 2)
+        cost = round(cost, 2)
         dt_hours += hrs
         dt_base += base
         dt_burden += burd
         dt_cost += cost
-        ws.cell(row=r, column=1, value=dt).border = thin_border
-        ws.cell(row=r, column=2, value=hrs).border = thin_border
-        ws.cell(row=r, column=3, value=base).border = thin_border
-        ws.cell(row=r, column=3).number_format = money_fmt
-        ws.cell(row=r, column=4, value=burd).border = thin_border
-        ws.cell(row=r, column=4).number_format = money_fmt
-        ws.cell(row=r, column=5, value=cost).border = thin_border
-        ws.cell(row=r, column=5).number_format = money_fmt
-
-    dtr = s4_start + 1 + len(sorted_dates)
-    ws.cell(row=dtr, column=1, value="Company Total").font = bold_font
-    ws.cell(row=dtr, column=1).border = thin_border
-    ws.cell(row=dtr, column=2, value=round(dt_hours, 2)).font = bold_font
-    ws.cell(row=dtr, column=2).border = thin_border
-    ws.cell(row=dtr, column=3, value=round(dt_base, 2)).font = bold_font
-    ws.cell(row=dtr, column=3).border = thin_border
-    ws.cell(row=dtr, column=3).number_format = money_fmt
-    ws.cell(row=dtr, column=4, value=round(dt_burden, 2)).font = bold_font
-    ws.cell(row=dtr, column=4).border = thin_border
-    ws.cell(row=dtr, column=4).number_format = money_fmt
-    ws.cell(row=dtr, column=5, value=round(dt_cost, 2)).font = bold_font
-    ws.cell(row=dtr, column=5).border = thin_border
-    ws.cell(row=dtr, column=5).number_format = money_fmt
+        rows.append([_xl_cell(ws, dt), _xl_cell(ws, hrs), _xl_cell(ws, base, "money"),
+                     _xl_cell(ws, burd, "money"), _xl_cell(ws, cost, "money")])
 
-    # Add logos
-    _xl_add_logos(ws, token_str, dtr)
+    rows.append([
+        _xl_cell(ws, "Company Total", "bold"), _xl_cell(ws, round(dt_hours, 2), "bold"),
+        _xl_cell(ws, round(dt_base, 2), "bold_money"), _xl_cell(ws, round(dt_burden, 2), "bold_money"),
+        _xl_cell(ws, round(dt_cost, 2), "bold_money"),
+    ])
+    dtr = len(rows)
+    del date_data, sorted_dates
 
-    # Auto-width columns
-    for col in ws.columns:
-        max_len = 0
-        col_letter = col[0].column_letter
-        for cell in col:
-            if cell.value:
-                max_len = max(max_len, len(str(cell.value)))
-        ws.column_dimensions[col_letter].width = min(max_len + 3, 40)
+    # Column widths must be known before the first append
+    _xl_set_column_widths(ws, rows)
+    ws.sheet_view.zoomScale = 140
 
-    for sheet in wb.worksheets:
-        sheet.sheet_view.zoomScale = 140
+    for row in rows:
+        ws.append(row)
 
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
+    # Add logos
+    _xl_add_logos(ws, logos.result(), dtr)
+
+    output = _xl_save(wb)
 
     date_range = ""
     if date_from:
@@ -1920,9 +1887,31 @@ def admin_export_combined():
     if date_to:
         date_range += f"_to_{date_to}"
     filename = f"combined_{company.replace(' ', '_')}{date_range}.xlsx"
+    return output.getvalue(), filename
+
+
+@time_admin_bp.route("/admin/export/combined")
+@login_required
+def admin_export_combined():
+    _app = _helpers()
+    token_str = request.args.get("token", "")
+    if not current_user.is_bdb:
+        token_str = current_user.token
+    date_from = request.args.get("date_from", "")
+    date_to = request.args.get("date_to", "")
+    _app._verify_token_access(token_str)
+
+    if not token_str:
+        flash("Token is required.", "error")
+        return redirect(url_for("time_admin.admin_export"))
+
+    # Repeat downloads of an unchanged range are served from memory
+    data, filename = _build_combined_xlsx(
+        token_str, date_from, date_to, database.get_export_fingerprint(token_str),
+    )
 
     return send_file(
-        output, as_attachment=True, download_name=filename,
+        BytesIO(data), as_attachment=True, download_name=filename,
         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     )
 
@@ -1946,28 +1935,26 @@ def admin_export_payroll_cost_pdf():
         flash("Token is required.", "error")
         return redirect(url_for("time_admin.admin_export"))
 
-    entries = database.get_time_entries_for_export(
+    # Aggregated in a single pass, so rows are streamed from the cursor
+    entries = database.iter_time_entries_for_export(
         token_str, date_from=date_from or None, date_to=date_to or None,
     )
     token_data = database.get_token(token_str)
     company = token_data["company_name"] if token_data else "Unknown"
     burden_pct = token_data.get("labor_burden_pct", 0) if token_data else 0
+    burden_mul = (burden_pct or 0) / 100.0
     company_logo = _company_logo_path(token_str)
 
-    eff_rates = database.get_effective_rates_for_entries(token_str, entries)
-
-    def _entry_base_pay(e):
-        hrs = float(e.get("total_hours") or 0)
-        if hrs <= 0 or e.get("hourly_wage") is None:
-            return 0.0
-        week = database._get_week_start_sunday(e["clock_in_time"])
-        rate_info = eff_rates.get((e["employee_id"], week))
-        if rate_info and rate_info["effective_rate"]:
-            return hrs * rate_info["effective_rate"]
-        return hrs * e["hourly_wage"]
+    eff_rates = database.get_effective_rates_for_export(
+        token_str, date_from=date_from or None, date_to=date_to or None,
+    )
 
     from fpdf import FPDF
 
+    # Bound once; every money and text cell in the tables goes through these
+    u = _usd
+    safe = _safe
+
     pdf = FPDF(orientation="L", unit="mm", format="A4")
     pdf.set_auto_page_break(auto=True, margin=28)
     pdf.add_page()
@@ -1976,7 +1963,7 @@ def admin_export_payroll_cost_pdf():
 
     # Title
     pdf.set_font("Helvetica", "B", 16)
-    pdf.cell(0, 10, _safe(f"{company} - Payroll Cost Report"), ln=True, align="C")
+    pdf.cell(0, 10, safe(f"{company} - Payroll Cost Report"), ln=True, align="C")
     pdf.set_font("Helvetica", "B", 10)
     pdf.set_text_color(220, 38, 38)
     pdf.cell(0, 6, "NOT FOR BOOKKEEPING PURPOSES", ln=True, align="C")
@@ -1988,176 +1975,151 @@ def admin_export_payroll_cost_pdf():
     if date_to:
         range_label += f"  to  {date_to}"
     if range_label:
-        pdf.cell(0, 5, _safe(f"{range_label}  |  Labor burden: {burden_pct}%"), ln=True, align="C")
+        pdf.cell(0, 5, safe(f"{range_label}  |  Labor burden: {burden_pct}%"), ln=True, align="C")
     pdf.ln(4)
 
-    # Aggregate employee data
-    emp_data = defaultdict(lambda: {"name": "", "emp_id": "", "hours": 0.0, "wage": None})
-    for e in entries:
-        key = e.get("emp_id_str", "")
-        emp_data[key]["name"] = e.get("employee_name", "")
-        emp_data[key]["emp_id"] = key
-        emp_data[key]["hours"] += float(e.get("total_hours") or 0)
-        if e.get("hourly_wage") is not None:
-            emp_data[key]["wage"] = e["hourly_wage"]
-    sorted_emps = sorted(emp_data.values(), key=lambda x: x["name"].lower())
+    # Aggregate all four sections in a single pass over entries
+    emp_data, ej_data, job_data, date_data = _aggregate_payroll(
+        _iter_base_pay(entries, eff_rates), burden_mul,
+    )
+    sorted_emps, sorted_ej, sorted_jobs = _sort_report_groups(emp_data, ej_data, job_data)
 
     # --- Section 1: Employee Cost Summary (green) ---
     _pdf_section_header(pdf, "Employee Cost Summary", _SECTION_COLORS["green"])
     s1_widths = [50, 30, 25, 25, 30, 30, 30]
+    w0, w1, w2, w3, w4, w5, w6 = s1_widths
     _pdf_table_header(pdf, ["Employee", "Emp ID", "Hours", "Rate", "Base Pay",
                             f"Burden ({burden_pct}%)", "Total Cost"],
                       s1_widths, _SECTION_COLORS["green"])
 
     total_hours = total_base = total_burden = total_cost = 0.0
     pdf.set_font("Helvetica", "", 8)
-    for emp in sorted_emps:
-        hours = round(emp["hours"], 2)
+    for emp_id, (name, hours, _, wage) in sorted_emps:
+        hours = round(hours, 2)
         total_hours += hours
-        pdf.cell(s1_widths[0], 6, _safe(emp["name"][:30]), border=1)
-        pdf.cell(s1_widths[1], 6, _safe(emp["emp_id"]), border=1)
-        pdf.cell(s1_widths[2], 6, str(hours), border=1, align="R")
-        if emp["wage"] is not None:
-            base = round(hours * emp["wage"], 2)
-            burd = round(base * (burden_pct / 100), 2)
+        row = [
+            (w0, safe(name[:30]), "L"),
+            (w1, safe(emp_id), "L"),
+            (w2, str(hours), "R"),
+        ]
+        if wage is not None:
+            base = round(hours * wage, 2)
+            burd = round(base * burden_mul, 2)
             cost = round(base + burd, 2)
             total_base += base
             total_burden += burd
             total_cost += cost
-            pdf.cell(s1_widths[3], 6, f"${emp['wage']:.2f}", border=1, align="R")
-            pdf.cell(s1_widths[4], 6, f"${base:,.2f}", border=1, align="R")
-            pdf.cell(s1_widths[5], 6, f"${burd:,.2f}", border=1, align="R")
-            pdf.cell(s1_widths[6], 6, f"${cost:,.2f}", border=1, align="R")
+            row += [
+                (w3, f"${wage:.2f}", "R"),
+                (w4, u(base), "R"),
+                (w5, u(burd), "R"),
+                (w6, u(cost), "R"),
+            ]
         else:
-            for _ in range(4):
-                pdf.cell(s1_widths[3], 6, _safe("--"), border=1, align="C")
-        pdf.ln()
+            row += [(w3, safe("--"), "C")] * 4
+        _pdf_table_row(pdf, row)
 
     pdf.set_font("Helvetica", "B", 8)
-    pdf.cell(s1_widths[0] + s1_widths[1], 7, "Company Total", border=1)
-    pdf.cell(s1_widths[2], 7, str(round(total_hours, 2)), border=1, align="R")
-    pdf.cell(s1_widths[3], 7, "", border=1)
-    pdf.cell(s1_widths[4], 7, f"${total_base:,.2f}", border=1, align="R")
-    pdf.cell(s1_widths[5], 7, f"${total_burden:,.2f}", border=1, align="R")
-    pdf.cell(s1_widths[6], 7, f"${total_cost:,.2f}", border=1, align="R")
-    pdf.ln()
+    row = [
+        (w0 + w1, "Company Total", "L"),
+        (w2, str(round(total_hours, 2)), "R"),
+        (w3, "", "L"),
+        (w4, u(total_base), "R"),
+        (w5, u(total_burden), "R"),
+        (w6, u(total_cost), "R"),
+    ]
+    _pdf_table_row(pdf, row, h=7)
 
     # --- Section 2: Employee Cost by Job (orange) ---
     _pdf_section_header(pdf, "Employee Cost by Job", _SECTION_COLORS["orange"])
     s2_widths = [42, 25, 45, 22, 22, 28, 28, 28]
+    w0, w1, w2, w3, w4, w5, w6, w7 = s2_widths
     _pdf_table_header(pdf, ["Employee", "Emp ID", "Job", "Hours", "Rate",
                             "Base Pay", "Burden", "Total Cost"],
                       s2_widths, _SECTION_COLORS["orange"])
 
-    ej_data = defaultdict(lambda: {"name": "", "emp_id": "", "job": "", "hours": 0.0, "wage": None})
-    for e in entries:
-        key = (e.get("emp_id_str", ""), e.get("job_name", ""))
-        ej_data[key]["name"] = e.get("employee_name", "")
-        ej_data[key]["emp_id"] = e.get("emp_id_str", "")
-        ej_data[key]["job"] = e.get("job_name", "")
-        ej_data[key]["hours"] += float(e.get("total_hours") or 0)
-        if e.get("hourly_wage") is not None:
-            ej_data[key]["wage"] = e["hourly_wage"]
-
-    sorted_ej = sorted(ej_data.values(), key=lambda x: (x["name"].lower(), x["job"].lower()))
     pdf.set_font("Helvetica", "", 8)
-    for ej in sorted_ej:
-        hours = round(ej["hours"], 2)
-        pdf.cell(s2_widths[0], 6, _safe(ej["name"][:25]), border=1)
-        pdf.cell(s2_widths[1], 6, _safe(ej["emp_id"]), border=1)
-        pdf.cell(s2_widths[2], 6, _safe(ej["job"][:28]), border=1)
-        pdf.cell(s2_widths[3], 6, str(hours), border=1, align="R")
-        if ej["wage"] is not None:
-            base = round(hours * ej["wage"], 2)
-            burd = round(base * (burden_pct / 100), 2)
-            cost = round(base + burd, 2)
-            pdf.cell(s2_widths[4], 6, f"${ej['wage']:.2f}", border=1, align="R")
-            pdf.cell(s2_widths[5], 6, f"${base:,.2f}", border=1, align="R")
-            pdf.cell(s2_widths[6], 6, f"${burd:,.2f}", border=1, align="R")
-            pdf.cell(s2_widths[7], 6, f"${cost:,.2f}", border=1, align="R")
+    for (emp_id, job_name), (name, hours, _, wage) in sorted_ej:
+        hours = round(hours, 2)
+        row = [
+            (w0, safe(name[:25]), "L"),
+            (w1, safe(emp_id), "L"),
+            (w2, safe(job_name[:28]), "L"),
+            (w3, str(hours), "R"),
+        ]
+        if wage is not None:
+            # Rounded: later cells are derived from these, as in section 1
+            base = round(hours * wage, 2)
+            burd = round(base * burden_mul, 2)
+            row += [
+                (w4, f"${wage:.2f}", "R"),
+                (w5, u(base), "R"),
+                (w6, u(burd), "R"),
+                (w7, u(base + burd), "R"),
+            ]
         else:
-            for _ in range(4):
-                pdf.cell(s2_widths[4], 6, _safe("--"), border=1, align="C")
-        pdf.ln()
+            row += [(w4, safe("--"), "C")] * 4
+        _pdf_table_row(pdf, row)
 
     # --- Section 3: Company Cost by Job (purple) ---
     _pdf_section_header(pdf, "Company Cost by Job", _SECTION_COLORS["purple"])
     s3_widths = [80, 25, 35, 35, 35]
+    w0, w1, w2, w3, w4 = s3_widths
     _pdf_table_header(pdf, ["Job", "Hours", "Base Pay", "Burden", "Total Cost"],
                       s3_widths, _SECTION_COLORS["purple"])
 
-    job_data = defaultdict(lambda: {"hours": 0.0, "base": 0.0, "burden": 0.0, "cost": 0.0})
-    for e in entries:
-        jn = e.get("job_name", "")
-        hours = float(e.get("total_hours") or 0)
-        job_data[jn]["hours"] += hours
-        base = _entry_base_pay(e)
-        if base > 0:
-            burd = base * (burden_pct / 100)
-            job_data[jn]["base"] += base
-            job_data[jn]["burden"] += burd
-            job_data[jn]["cost"] += base + burd
-
-    sorted_jobs = sorted(job_data.items(), key=lambda x: x[0].lower())
     pdf.set_font("Helvetica", "", 8)
-    for jname, jd in sorted_jobs:
-        pdf.cell(s3_widths[0], 6, _safe(jname[:48]), border=1)
-        pdf.cell(s3_widths[1], 6, str(round(jd["hours"], 2)), border=1, align="R")
-        pdf.cell(s3_widths[2], 6, f"${jd['base']:,.2f}", border=1, align="R")
-        pdf.cell(s3_widths[3], 6, f"${jd['burden']:,.2f}", border=1, align="R")
-        pdf.cell(s3_widths[4], 6, f"${jd['cost']:,.2f}", border=1, align="R")
-        pdf.ln()
+    for jname, (hours, base, burden, cost) in sorted_jobs:
+        row = [
+            (w0, safe(jname[:48]), "L"),
+            (w1, str(round(hours, 2)), "R"),
+            (w2, u(base), "R"),
+            (w3, u(burden), "R"),
+            (w4, u(cost), "R"),
+        ]
+        _pdf_table_row(pdf, row)
 
     pdf.set_font("Helvetica", "B", 8)
-    pdf.cell(s3_widths[0], 7, "Company Total", border=1)
-    pdf.cell(s3_widths[1], 7, str(round(total_hours, 2)), border=1, align="R")
-    pdf.cell(s3_widths[2], 7, f"${total_base:,.2f}", border=1, align="R")
-    pdf.cell(s3_widths[3], 7, f"${total_burden:,.2f}", border=1, align="R")
-    pdf.cell(s3_widths[4], 7, f"${total_cost:,.2f}", border=1, align="R")
-    pdf.ln()
+    row = [
+        (w0, "Company Total", "L"),
+        (w1, str(round(total_hours, 2)), "R"),
+        (w2, u(total_base), "R"),
+        (w3, u(total_burden), "R"),
+        (w4, u(total_cost), "R"),
+    ]
+    _pdf_table_row(pdf, row, h=7)
 
     # --- Section 4: Company Cost by Date (blue) ---
     _pdf_section_header(pdf, "Company Cost by Date", _SECTION_COLORS["blue"])
     s4_widths = [80, 25, 35, 35, 35]
+    w0, w1, w2, w3, w4 = s4_widths
     _pdf_table_header(pdf, ["Date", "Hours", "Base Pay", "Burden", "Total Cost"],
                       s4_widths, _SECTION_COLORS["blue"])
 
-    date_data = defaultdict(lambda: {"hours": 0.0, "base": 0.0, "burden": 0.0, "cost": 0.0})
-    for e in entries:
-        dt = (e.get("clock_in_time") or "")[:10]
-        hours = float(e.get("total_hours") or 0)
-        date_data[dt]["hours"] += hours
-        base = _entry_base_pay(e)
-        if base > 0:
-            burd = base * (burden_pct / 100)
-            date_data[dt]["base"] += base
-            date_data[dt]["burden"] += burd
-            date_data[dt]["cost"] += base + burd
-
     sorted_dates = sorted(date_data.items())
     pdf.set_font("Helvetica", "", 8)
-    for dt, dd in sorted_dates:
-        pdf.cell(s4_widths[0], 6, _safe(dt), border=1)
-        pdf.cell(s4_widths[1], 6, str(round(dd["hours"], 2)), border=1, align="R")
-        pdf.cell(s4_widths[2], 6, f"${dd['base']:,.2f}", border=1, align="R")
-        pdf.cell(s4_widths[3], 6, f"${dd['burden']:,.2f}", border=1, align="R")
-        pdf.cell(s4_widths[4], 6, f"${dd['cost']:,.2f}", border=1, align="R")
-        pdf.ln()
+    for dt, (hours, base, burden, cost) in sorted_dates:
+        row = [
+            (w0, safe(dt), "L"),
+            (w1, str(round(hours, 2)), "R"),
+            (w2, u(base), "R"),
+            (w3, u(burden), "R"),
+            (w4, u(cost), "R"),
+        ]
+        _pdf_table_row(pdf, row)
 
     pdf.set_font("Helvetica", "B", 8)
-    pdf.cell(s4_widths[0], 7, "Company Total", border=1)
-    pdf.cell(s4_widths[1], 7, str(round(total_hours, 2)), border=1, align="R")
-    pdf.cell(s4_widths[2], 7, f"${total_base:,.2f}", border=1, align="R")
-    pdf.cell(s4_widths[3], 7, f"${total_burden:,.2f}", border=1, align="R")
-    pdf.cell(s4_widths[4], 7, f"${total_cost:,.2f}", border=1, align="R")
-    pdf.ln()
+    row = [
+        (w0, "Company Total", "L"),
+        (w1, str(round(total_hours, 2)), "R"),
+        (w2, u(total_base), "R"),
+        (w3, u(total_burden), "R"),
+        (w4, u(total_cost), "R"),
+    ]
+    _pdf_table_row(pdf, row, h=7)
 
     _pdf_add_bdb_footer(pdf)
 
-    output = BytesIO()
-    pdf.output(output)
-    output.seek(0)
-
     date_range = ""
     if date_from:
         date_range += f"_{date_from}"
@@ -2165,10 +2127,7 @@ def admin_export_payroll_cost_pdf():
         date_range += f"_to_{date_to}"
     filename = f"payroll_cost_{company.replace(' ', '_')}{date_range}.pdf"
 
-    return send_file(
-        output, as_attachment=True, download_name=filename,
-        mimetype="application/pdf",
-    )
+    return _pdf_send(pdf, filename)
 
 
 # ---------------------------------------------------------------------------
@@ -2190,28 +2149,26 @@ def admin_export_combined_pdf():
         flash("Token is required.", "error")
         return redirect(url_for("time_admin.admin_export"))
 
-    entries = database.get_time_entries_for_export(
+    # Aggregated in a single pass, so rows are streamed from the cursor
+    entries = database.iter_time_entries_for_export(
         token_str, date_from=date_from or None, date_to=date_to or None,
     )
     token_data = database.get_token(token_str)
     company = token_data["company_name"] if token_data else "Unknown"
     burden_pct = token_data.get("labor_burden_pct", 0) if token_data else 0
+    burden_mul = (burden_pct or 0) / 100.0
     company_logo = _company_logo_path(token_str)
 
-    eff_rates = database.get_effective_rates_for_entries(token_str, entries)
-
-    def _entry_base_pay(e):
-        hrs = float(e.get("total_hours") or 0)
-        if hrs <= 0 or e.get("hourly_wage") is None:
-            return 0.0
-        week = database._get_week_start_sunday(e["clock_in_time"])
-        rate_info = eff_rates.get((e["employee_id"], week))
-        if rate_info and rate_info["effective_rate"]:
-            return hrs * rate_info["effective_rate"]
-        return hrs * e["hourly_wage"]
+    eff_rates = database.get_effective_rates_for_export(
+        token_str, date_from=date_from or None, date_to=date_to or None,
+    )
 
     from fpdf import FPDF
 
+    # Bound once; every money and text cell in the tables goes through these
+    u = _usd
+    safe = _safe
+
     pdf = FPDF(orientation="L", unit="mm", format="A4")
     pdf.set_auto_page_break(auto=True, margin=28)
     pdf.add_page()
@@ -2220,7 +2177,7 @@ def admin_export_combined_pdf():
 
     # Title
     pdf.set_font("Helvetica", "B", 16)
-    pdf.cell(0, 10, _safe(f"{company} - Combined Report"), ln=True, align="C")
+    pdf.cell(0, 10, safe(f"{company} - Combined Report"), ln=True, align="C")
     pdf.set_font("Helvetica", "B", 10)
     pdf.set_text_color(220, 38, 38)
     pdf.cell(0, 6, "NOT FOR BOOKKEEPING PURPOSES", ln=True, align="C")
@@ -2232,181 +2189,157 @@ def admin_export_combined_pdf():
     if date_to:
         range_label += f"  to  {date_to}"
     if range_label:
-        pdf.cell(0, 5, _safe(f"{range_label}  |  Labor burden: {burden_pct}%"), ln=True, align="C")
+        pdf.cell(0, 5, safe(f"{range_label}  |  Labor burden: {burden_pct}%"), ln=True, align="C")
     pdf.ln(4)
 
-    # Aggregate data
-    emp_data = defaultdict(lambda: {"name": "", "emp_id": "", "hours": 0.0, "wage": None})
-    for e in entries:
-        key = e.get("emp_id_str", "")
-        emp_data[key]["name"] = e.get("employee_name", "")
-        emp_data[key]["emp_id"] = key
-        emp_data[key]["hours"] += float(e.get("total_hours") or 0)
-        if e.get("hourly_wage") is not None:
-            emp_data[key]["wage"] = e["hourly_wage"]
-    sorted_emps = sorted(emp_data.values(), key=lambda x: x["name"].lower())
+    # Aggregate all four sections in a single pass over entries
+    emp_data, ej_data, job_data, date_data = _aggregate_payroll(
+        _iter_base_pay(entries, eff_rates), burden_mul,
+    )
+
+    sorted_emps, sorted_ej, sorted_jobs = _sort_report_groups(emp_data, ej_data, job_data)
 
     # --- Section 1: Employee Summary (green) ---
     _pdf_section_header(pdf, "Employee Summary", _SECTION_COLORS["green"])
     s1_widths = [50, 30, 25, 25, 30, 30, 30]
+    w0, w1, w2, w3, w4, w5, w6 = s1_widths
     _pdf_table_header(pdf, ["Employee", "Emp ID", "Hours", "Rate", "Base Pay",
                             f"Burden ({burden_pct}%)", "Total Cost"],
                       s1_widths, _SECTION_COLORS["green"])
 
     company_hours = company_base = company_burden = company_cost = 0.0
     pdf.set_font("Helvetica", "", 8)
-    for emp in sorted_emps:
-        hours = round(emp["hours"], 2)
+    for emp_id, (name, hours, _, wage) in sorted_emps:
+        hours = round(hours, 2)
         company_hours += hours
-        pdf.cell(s1_widths[0], 6, _safe(emp["name"][:30]), border=1)
-        pdf.cell(s1_widths[1], 6, _safe(emp["emp_id"]), border=1)
-        pdf.cell(s1_widths[2], 6, str(hours), border=1, align="R")
-        if emp["wage"] is not None:
-            base = round(hours * emp["wage"], 2)
-            burd = round(base * (burden_pct / 100), 2)
+        row = [
+            (w0, safe(name[:30]), "L"),
+            (w1, safe(emp_id), "L"),
+            (w2, str(hours), "R"),
+        ]
+        if wage is not None:
+            base = round(hours * wage, 2)
+            burd = round(base * burden_mul, 2)
             cost = round(base + burd, 2)
             company_base += base
             company_burden += burd
             company_cost += cost
-            pdf.cell(s1_widths[3], 6, f"${emp['wage']:.2f}", border=1, align="R")
-            pdf.cell(s1_widths[4], 6, f"${base:,.2f}", border=1, align="R")
-            pdf.cell(s1_widths[5], 6, f"${burd:,.2f}", border=1, align="R")
-            pdf.cell(s1_widths[6], 6, f"${cost:,.2f}", border=1, align="R")
+            row += [
+                (w3, f"${wage:.2f}", "R"),
+                (w4, u(base), "R"),
+                (w5, u(burd), "R"),
+                (w6, u(cost), "R"),
+            ]
         else:
-            for _ in range(4):
-                pdf.cell(s1_widths[3], 6, _safe("--"), border=1, align="C")
-        pdf.ln()
+            row += [(w3, safe("--"), "C")] * 4
+        _pdf_table_row(pdf, row)
 
     pdf.set_font("Helvetica", "B", 8)
-    pdf.cell(s1_widths[0] + s1_widths[1], 7, "Company Total", border=1)
-    pdf.cell(s1_widths[2], 7, str(round(company_hours, 2)), border=1, align="R")
-    pdf.cell(s1_widths[3], 7, "", border=1)
-    pdf.cell(s1_widths[4], 7, f"${company_base:,.2f}", border=1, align="R")
-    pdf.cell(s1_widths[5], 7, f"${company_burden:,.2f}", border=1, align="R")
-    pdf.cell(s1_widths[6], 7, f"${company_cost:,.2f}", border=1, align="R")
-    pdf.ln()
+    row = [
+        (w0 + w1, "Company Total", "L"),
+        (w2, str(round(company_hours, 2)), "R"),
+        (w3, "", "L"),
+        (w4, u(company_base), "R"),
+        (w5, u(company_burden), "R"),
+        (w6, u(company_cost), "R"),
+    ]
+    _pdf_table_row(pdf, row, h=7)
 
     # --- Section 2: Employee Hours by Job (orange) ---
     _pdf_section_header(pdf, "Employee Hours by Job", _SECTION_COLORS["orange"])
     s2_widths = [42, 25, 45, 22, 22, 28, 28, 28]
+    w0, w1, w2, w3, w4, w5, w6, w7 = s2_widths
     _pdf_table_header(pdf, ["Employee", "Emp ID", "Job", "Hours", "Rate",
                             "Base Pay", "Burden", "Total Cost"],
                       s2_widths, _SECTION_COLORS["orange"])
 
-    ej_data = defaultdict(lambda: {"name": "", "emp_id": "", "job": "", "hours": 0.0, "wage": None})
-    for e in entries:
-        key = (e.get("emp_id_str", ""), e.get("job_name", ""))
-        ej_data[key]["name"] = e.get("employee_name", "")
-        ej_data[key]["emp_id"] = e.get("emp_id_str", "")
-        ej_data[key]["job"] = e.get("job_name", "")
-        ej_data[key]["hours"] += float(e.get("total_hours") or 0)
-        if e.get("hourly_wage") is not None:
-            ej_data[key]["wage"] = e["hourly_wage"]
-
-    sorted_ej = sorted(ej_data.values(), key=lambda x: (x["name"].lower(), x["job"].lower()))
     pdf.set_font("Helvetica", "", 8)
-    for ej in sorted_ej:
-        hours = round(ej["hours"], 2)
-        pdf.cell(s2_widths[0], 6, _safe(ej["name"][:25]), border=1)
-        pdf.cell(s2_widths[1], 6, _safe(ej["emp_id"]), border=1)
-        pdf.cell(s2_widths[2], 6, _safe(ej["job"][:28]), border=1)
-        pdf.cell(s2_widths[3], 6, str(hours), border=1, align="R")
-        if ej["wage"] is not None:
-            base = round(hours * ej["wage"], 2)
-            burd = round(base * (burden_pct / 100), 2)
-            cost = round(base + burd, 2)
-            pdf.cell(s2_widths[4], 6, f"${ej['wage']:.2f}", border=1, align="R")
-            pdf.cell(s2_widths[5], 6, f"${base:,.2f}", border=1, align="R")
-            pdf.cell(s2_widths[6], 6, f"${burd:,.2f}", border=1, align="R")
-            pdf.cell(s2_widths[7], 6, f"${cost:,.2f}", border=1, align="R")
+    for (emp_id, job_name), (name, hours, _, wage) in sorted_ej:
+        hours = round(hours, 2)
+        row = [
+            (w0, safe(name[:25]), "L"),
+            (w1, safe(emp_id), "L"),
+            (w2, safe(job_name[:28]), "L"),
+            (w3, str(hours), "R"),
+        ]
+        if wage is not None:
+            # Rounded: later cells are derived from these, as in section 1
+            base = round(hours * wage, 2)
+            burd = round(base * burden_mul, 2)
+            row += [
+                (w4, f"${wage:.2f}", "R"),
+                (w5, u(base), "R"),
+                (w6, u(burd), "R"),
+                (w7, u(base + burd), "R"),
+            ]
         else:
-            for _ in range(4):
-                pdf.cell(s2_widths[4], 6, _safe("--"), border=1, align="C")
-        pdf.ln()
+            row += [(w4, safe("--"), "C")] * 4
+        _pdf_table_row(pdf, row)
 
     # --- Section 3: Company Hours by Job (purple) ---
     _pdf_section_header(pdf, "Company Hours by Job", _SECTION_COLORS["purple"])
     s3_widths = [80, 25, 35, 35, 35]
+    w0, w1, w2, w3, w4 = s3_widths
     _pdf_table_header(pdf, ["Job", "Hours", "Base Pay", "Burden", "Total Cost"],
                       s3_widths, _SECTION_COLORS["purple"])
 
-    job_data = defaultdict(lambda: {"hours": 0.0, "base": 0.0, "burden": 0.0, "cost": 0.0})
-    for e in entries:
-        jn = e.get("job_name", "")
-        hours = float(e.get("total_hours") or 0)
-        job_data[jn]["hours"] += hours
-        base = _entry_base_pay(e)
-        if base > 0:
-            burd = base * (burden_pct / 100)
-            job_data[jn]["base"] += base
-            job_data[jn]["burden"] += burd
-            job_data[jn]["cost"] += base + burd
-
-    sorted_jobs = sorted(job_data.items(), key=lambda x: x[0].lower())
     jt_hours = jt_base = jt_burden = jt_cost = 0.0
     pdf.set_font("Helvetica", "", 8)
-    for jname, jd in sorted_jobs:
-        jt_hours += jd["hours"]
-        jt_base += jd["base"]
-        jt_burden += jd["burden"]
-        jt_cost += jd["cost"]
-        pdf.cell(s3_widths[0], 6, _safe(jname[:48]), border=1)
-        pdf.cell(s3_widths[1], 6, str(round(jd["hours"], 2)), border=1, align="R")
-        pdf.cell(s3_widths[2], 6, f"${jd['base']:,.2f}", border=1, align="R")
-        pdf.cell(s3_widths[3], 6, f"${jd['burden']:,.2f}", border=1, align="R")
-        pdf.cell(s3_widths[4], 6, f"${jd['cost']:,.2f}", border=1, align="R")
-        pdf.ln()
+    for jname, (hours, base, burden, cost) in sorted_jobs:
+        jt_hours += hours
+        jt_base += base
+        jt_burden += burden
+        jt_cost += cost
+        row = [
+            (w0, safe(jname[:48]), "L"),
+            (w1, str(round(hours, 2)), "R"),
+            (w2, u(base), "R"),
+            (w3, u(burden), "R"),
+            (w4, u(cost), "R"),
+        ]
+        _pdf_table_row(pdf, row)
 
     pdf.set_font("Helvetica", "B", 8)
-    pdf.cell(s3_widths[0], 7, "Company Total", border=1)
-    pdf.cell(s3_widths[1], 7, str(round(jt_hours, 2)), border=1, align="R")
-    pdf.cell(s3_widths[2], 7, f"${jt_base:,.2f}", border=1, align="R")
-    pdf.cell(s3_widths[3], 7, f"${jt_burden:,.2f}", border=1, align="R")
-    pdf.cell(s3_widths[4], 7, f"${jt_cost:,.2f}", border=1, align="R")
-    pdf.ln()
+    row = [
+        (w0, "Company Total", "L"),
+        (w1, str(round(jt_hours, 2)), "R"),
+        (w2, u(jt_base), "R"),
+        (w3, u(jt_burden), "R"),
+        (w4, u(jt_cost), "R"),
+    ]
+    _pdf_table_row(pdf, row, h=7)
 
     # --- Section 4: Company Cost by Date (blue) ---
     _pdf_section_header(pdf, "Company Cost by Date", _SECTION_COLORS["blue"])
     s4_widths = [80, 25, 35, 35, 35]
+    w0, w1, w2, w3, w4 = s4_widths
     _pdf_table_header(pdf, ["Date", "Hours", "Base Pay", "Burden", "Total Cost"],
                       s4_widths, _SECTION_COLORS["blue"])
 
-    date_data = defaultdict(lambda: {"hours": 0.0, "base": 0.0, "burden": 0.0, "cost": 0.0})
-    for e in entries:
-        dt = (e.get("clock_in_time") or "")[:10]
-        hours = float(e.get("total_hours") or 0)
-        date_data[dt]["hours"] += hours
-        base = _entry_base_pay(e)
-        if base > 0:
-            burd = base * (burden_pct / 100)
-            date_data[dt]["base"] += base
-            date_data[dt]["burden"] += burd
-            date_data[dt]["cost"] += base + burd
-
     sorted_dates = sorted(date_data.items())
     pdf.set_font("Helvetica", "", 8)
-    for dt, dd in sorted_dates:
-        pdf.cell(s4_widths[0], 6, _safe(dt), border=1)
-        pdf.cell(s4_widths[1], 6, str(round(dd["hours"], 2)), border=1, align="R")
-        pdf.cell(s4_widths[2], 6, f"${dd['base']:,.2f}", border=1, align="R")
-        pdf.cell(s4_widths[3], 6, f"${dd['burden']:,.2f}", border=1, align="R")
-        pdf.cell(s4_widths[4], 6, f"${dd['cost']:,.2f}", border=1, align="R")
-        pdf.ln()
+    for dt, (hours, base, burden, cost) in sorted_dates:
+        row = [
+            (w0, safe(dt), "L"),
+            (w1, str(round(hours, 2)), "R"),
+            (w2, u(base), "R"),
+            (w3, u(burden), "R"),
+            (w4, u(cost), "R"),
+        ]
+        _pdf_table_row(pdf, row)
 
     pdf.set_font("Helvetica", "B", 8)
-    pdf.cell(s4_widths[0], 7, "Company Total", border=1)
-    pdf.cell(s4_widths[1], 7, str(round(company_hours, 2)), border=1, align="R")
-    pdf.cell(s4_widths[2], 7, f"${company_base:,.2f}", border=1, align="R")
-    pdf.cell(s4_widths[3], 7, f"${company_burden:,.2f}", border=1, align="R")
-    pdf.cell(s4_widths[4], 7, f"${company_cost:,.2f}", border=1, align="R")
-    pdf.ln()
+    row = [
+        (w0, "Company Total", "L"),
+        (w1, str(round(company_hours, 2)), "R"),
+        (w2, u(company_base), "R"),
+        (w3, u(company_burden), "R"),
+        (w4, u(company_cost), "R"),
+    ]
+    _pdf_table_row(pdf, row, h=7)
 
     _pdf_add_bdb_footer(pdf)
 
-    output = BytesIO()
-    pdf.output(output)
-    output.seek(0)
-
     date_range = ""
     if date_from:
         date_range += f"_{date_from}"
@@ -2414,10 +2347,7 @@ def admin_export_combined_pdf():
         date_range += f"_to_{date_to}"
     filename = f"combined_{company.replace(' ', '_')}{date_range}.pdf"
 
-    return send_file(
-        output, as_attachment=True, download_name=filename,
-        mimetype="application/pdf",
-    )
+    return _pdf_send(pdf, filename)
 
 
 # ---------------------------------------------------------------------------
@@ -128,12 +128,14 @@ def employee_tasks():
     # Tasks come from explicit schedule-entry assignments only
     schedules = database.get_schedules_for_employee_date(employee["id"], token_str, today)
 
+    jobs_by_id = database.get_jobs(s["job_id"] for s in schedules)
+
     jobs_tasks = []
     for sched in schedules:
         tasks = database.get_tasks_for_schedule(token_str, sched["id"], today)
         if not tasks:
             continue
-        job_obj = database.get_job(sched["job_id"])
+        job_obj = jobs_by_id.get(sched["job_id"])
         job_mode = job_obj.get("reset_per_visit", 1) if job_obj else 1
         estimate_id = sched.get("estimate_id")
         estimate = database.get_estimate(estimate_id) if estimate_id else None
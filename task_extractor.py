@@ -7,15 +7,21 @@ maintains a per-job markdown vault for richer LLM context over time.
 import json
 import logging
 import re
-import urllib.request
-import urllib.error
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import requests
+
 import config
 import database
 
 logger = logging.getLogger(__name__)
 
+_SAFE_NAME_RE = re.compile(r"[^\w\s-]")
+# ASCII characters _SAFE_NAME_RE strips, for the str.translate fast path
+_SAFE_NAME_DROP = {i: None for i in range(128) if _SAFE_NAME_RE.match(chr(i))}
+_JSON_ARRAY_RE = re.compile(r"\[.*?\]", re.DOTALL)
+
 
 # ---------------------------------------------------------------------------
 # Markdown vault helpers
@@ -23,7 +29,11 @@ logger = logging.getLogger(__name__)
 
 def _safe_name(text):
     """Convert text to a filesystem-safe name."""
-    return re.sub(r"[^\w\s-]", "", text).strip().replace(" ", "_")[:60]
+    if text.isascii():
+        text = text.translate(_SAFE_NAME_DROP)
+    else:
+        text = _SAFE_NAME_RE.sub("", text)
+    return text.strip().replace(" ", "_")[:60]
 
 
 def _vault_dir(token_str, job_name):
@@ -53,39 +63,74 @@ def write_estimate_markdown(estimate, job_name, transcription, photo_captions=No
 
     if photo_captions:
         lines.append("## Photo Captions")
-        for cap in photo_captions:
-            lines.append(f"- {cap}")
+        lines.append("\n".join(f"- {cap}" for cap in photo_captions))
         lines.append("")
 
-    (vault / filename).write_text("\n".join(lines), encoding="utf-8")
+    path = vault / filename
+    rewrite = path.exists()
+    content = "\n".join(lines)
+    path.write_bytes(content.encode("utf-8"))
 
-    # Update job summary
-    _update_summary(vault, job_name)
+    # Update job summary: append the new estimate, or rebuild if this one
+    # was already in it (reprocessing) or the summary is missing
+    summary = vault / "_summary.md"
+    if rewrite or not summary.exists():
+        _update_summary(vault, job_name)
+    else:
+        with open(summary, "a", encoding="utf-8") as f:
+            f.write(f"\n{content}\n\n---\n")
 
 
 def _update_summary(vault, job_name):
-    """Rebuild _summary.md from all estimate files in the vault."""
+    """Rebuild _summary.md from all estimate files in the vault.
+
+    write_estimate_markdown() appends to the summary in the same layout,
+    so this full rebuild is only needed when an estimate is rewritten.
+    """
     estimate_files = sorted(vault.glob("estimate_*.md"))
     lines = [f"# {job_name} — Estimate Summary", ""]
     for f in estimate_files:
         lines.append(f.read_text(encoding="utf-8"))
         lines.append("\n---\n")
-    (vault / "_summary.md").write_text("\n".join(lines), encoding="utf-8")
+    (vault / "_summary.md").write_bytes("\n".join(lines).encode("utf-8"))
+
+
+# (token, job_name) -> ((st_mtime_ns, st_size), summary text)
+_CTX_CACHE = {}
 
 
 def get_job_context(token_str, job_name):
-    """Read the job summary markdown for LLM context. Returns '' if none."""
+    """Read the job summary markdown for LLM context. Returns '' if none.
+
+    The text is cached per job and re-read only when the file's mtime or
+    size changes, so batch extraction doesn't reload the same summary.
+    """
     vault = _vault_dir(token_str, job_name)
     summary = vault / "_summary.md"
-    if summary.exists():
-        return summary.read_text(encoding="utf-8")
-    return ""
+    key = (token_str, job_name)
+    try:
+        st = summary.stat()
+    except FileNotFoundError:
+        _CTX_CACHE.pop(key, None)
+        return ""
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _CTX_CACHE.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    text = summary.read_text(encoding="utf-8")
+    _CTX_CACHE[key] = (stamp, text)
+    return text
 
 
 # ---------------------------------------------------------------------------
 # Ollama task extraction
 # ---------------------------------------------------------------------------
 
+# Shared keep-alive session: back-to-back extractions from the task queue
+# reuse one connection to Ollama instead of reconnecting per call
+_SESSION = requests.Session()
+
+
 def _call_ollama(prompt, system_prompt=""):
     """Send a prompt to Ollama and return the response text."""
     payload = {
@@ -94,21 +139,21 @@ def _call_ollama(prompt, system_prompt=""):
         "system": system_prompt,
         "stream": False,
     }
-    data = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(
-        config.OLLAMA_URL,
-        data=data,
-        headers={"Content-Type": "application/json"},
-    )
     try:
-        with urllib.request.urlopen(req, timeout=120) as resp:
-            result = json.loads(resp.read().decode("utf-8"))
-            return result.get("response", "")
-    except (urllib.error.URLError, urllib.error.HTTPError, TimeoutError) as e:
+        resp = _SESSION.post(config.OLLAMA_URL, json=payload, timeout=120)
+        resp.raise_for_status()
+        # json.loads takes the raw bytes, skipping requests' text decode
+        return json.loads(resp.content).get("response", "")
+    except (requests.RequestException, ValueError) as e:
         logger.warning(f"Ollama call failed: {e}")
         return ""
 
 
+def _clean_tasks(tasks):
+    """Stringify and strip parsed task names, dropping empty ones."""
+    return [name for name in (str(t).strip() for t in tasks) if name]
+
+
 def extract_tasks(estimate, job_name, transcription, photo_captions=None):
     """Extract tasks from an estimate transcription using Ollama.
 
@@ -154,22 +199,23 @@ def extract_tasks(estimate, job_name, transcription, photo_captions=None):
     if not response:
         return []
 
-    # Parse JSON array from response
-    try:
-        # Try direct parse first
-        tasks = json.loads(response)
-        if isinstance(tasks, list):
-            return [str(t).strip() for t in tasks if str(t).strip()]
-    except json.JSONDecodeError:
-        pass
+    # Parse JSON array from response. Only a reply that starts with "[" can
+    # parse directly as a list, so mixed text skips the doomed first attempt
+    if response.lstrip().startswith("["):
+        try:
+            tasks = json.loads(response)
+            if isinstance(tasks, list):
+                return _clean_tasks(tasks)
+        except json.JSONDecodeError:
+            pass
 
     # Try extracting JSON array from markdown code block or mixed text
-    match = re.search(r"\[.*?\]", response, re.DOTALL)
+    match = _JSON_ARRAY_RE.search(response)
     if match:
         try:
             tasks = json.loads(match.group())
             if isinstance(tasks, list):
-                return [str(t).strip() for t in tasks if str(t).strip()]
+                return _clean_tasks(tasks)
         except json.JSONDecodeError:
             pass
 
@@ -197,6 +243,11 @@ def process_estimate_tasks(estimate):
     # Write vault markdown
     write_estimate_markdown(estimate, job_name, transcription, photo_captions)
 
+    # Too short to hold actionable tasks; skip the Ollama round-trip
+    if len(transcription.split()) < config.MIN_TASK_WORDS:
+        logger.info(f"Skipping task extraction for short estimate {estimate['id']}")
+        return
+
     # Extract tasks via Ollama
     task_names = extract_tasks(estimate, job_name, transcription, photo_captions)
     for name in task_names:
@@ -206,6 +257,30 @@ def process_estimate_tasks(estimate):
         logger.info(f"Extracted {len(task_names)} tasks for estimate {estimate['id']}")
 
 
+def process_estimates_batch(estimates):
+    """Re-run task extraction for many estimates, e.g. after a model change.
+
+    Extraction is network-bound on Ollama, so jobs run on up to
+    config.OLLAMA_PARALLEL threads. Estimates for the same job stay on one
+    thread, in order, so its vault summary is written serially. Call from
+    Python REPL.
+    """
+    by_vault = {}
+    for est in estimates:
+        key = (est["token"], _safe_name(est.get("job_name") or ""))
+        by_vault.setdefault(key, []).append(est)
+
+    def run(group):
+        for est in group:
+            try:
+                process_estimate_tasks(est)
+            except Exception as e:
+                logger.warning(f"Task extraction failed for estimate {est['id']}: {e}")
+
+    with ThreadPoolExecutor(max_workers=config.OLLAMA_PARALLEL) as ex:
+        list(ex.map(run, by_vault.values()))
+
+
 def test_extraction(text, model=None):
     """Quick test function for comparing models. Call from Python REPL."""
     old_model = config.OLLAMA_MODEL
@@ -1,56 +1,125 @@
 """Database-backed single-worker task queue for GPU-bound processing.
 
 Uses the submissions table (status column) as the queue instead of an
-in-memory Queue.  This works correctly with Gunicorn's pre-fork model:
-every worker process starts a polling thread, but a file lock ensures
-only ONE thread across all processes runs GPU work at any given time.
+in-memory Queue.  Gunicorn workers only insert rows; ONE dedicated
+process (gpu_worker.py) runs the polling loop and holds the Whisper
+model, so GPU work is serialized without any cross-process lock.
 """
 
-import fcntl
 import logging
+import os
+import select
+import socket
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
 from pathlib import Path
 
 import config
 import database
+import task_wake
 import transcriber
 import pdf_generator
 
 logger = logging.getLogger(__name__)
 
 _worker_thread = None
-_lock_path = config.INSTANCE_DIR / "gpu_worker.lock"
+_wake_path = task_wake.WAKE_PATH
 _last_purge_file = config.INSTANCE_DIR / "task_purge_last_run.txt"
+_last_purge_date = None  # in-memory copy of _last_purge_file, read once
 _last_reminder_check = datetime(2000, 1, 1)  # ensures first check runs immediately
 
 POLL_INTERVAL = 2
 
+# Decodes the next submission's audio while the current one transcribes
+_audio_prefetch = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-prefetch")
+# Builds and writes receipt PDFs so the next transcription doesn't wait on them
+_pdf_writer = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="pdf-writer",
+    initializer=database.use_thread_connection,
+)
+# Submissions claimed and processed per pass while the GPU lock is held
+BATCH_SIZE = 8
+
+
+def _open_wake_socket():
+    """Bind the datagram socket task_wake.notify() pings, replacing a stale one."""
+    _wake_path.unlink(missing_ok=True)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(str(_wake_path))
+    sock.setblocking(False)
+    return sock
+
+
+def _worker_running():
+    """True if a live process (e.g. gpu_worker.py) is bound to the wake socket.
+
+    Connecting to a stale socket file is refused, so this needs no pid file.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as probe:
+        try:
+            probe.connect(str(_wake_path))
+        except OSError:
+            return False
+    return True
+
+
+def _wait_for_wake(sock):
+    """Block until notify() pings the socket or POLL_INTERVAL passes."""
+    if select.select([sock], [], [], POLL_INTERVAL)[0]:
+        # Drain, so a burst of uploads costs one extra poll, not one each
+        try:
+            while True:
+                sock.recv(16)
+        except BlockingIOError:
+            pass
+
+
+def _warm_up():
+    """Load (and on GPU, warm up) the Whisper model before the first poll.
+
+    Otherwise the first queued task also pays for reading the weights
+    and initializing the device. A failure is logged and retried lazily
+    by the first transcribe() call.
+    """
+    try:
+        transcriber.warm_up()
+    except Exception as e:
+        logger.error(f"Whisper model preload failed: {e}")
+
 
 def _worker():
     """Background worker: polls DB for pending tasks, processes one at a time."""
-    lock_fd = open(_lock_path, "w")
+    database.use_thread_connection()
+    wake = _open_wake_socket()
+    _warm_up()
     while True:
         try:
-            fcntl.flock(lock_fd, fcntl.LOCK_EX)
             try:
                 _poll_and_process()
             finally:
-                fcntl.flock(lock_fd, fcntl.LOCK_UN)
-            time.sleep(POLL_INTERVAL)
+                database.end_thread_transaction()
+            _wait_for_wake(wake)
         except Exception as e:
             logger.error(f"Worker loop error: {e}")
             time.sleep(POLL_INTERVAL)
 
 
 def _run_daily_task_purge():
-    """Purge old task completions once per calendar day using a timestamp file."""
+    """Purge old task completions once per calendar day using a timestamp file.
+
+    The file is only read on the first pass; after that the date is kept
+    in memory, so an idle poll does no file I/O here.
+    """
+    global _last_purge_date
     today_str = date.today().isoformat()
+    if _last_purge_date == today_str:
+        return
     try:
-        if _last_purge_file.exists():
-            last_run = _last_purge_file.read_text().strip()
-            if last_run == today_str:
+        if _last_purge_date is None and _last_purge_file.exists():
+            _last_purge_date = _last_purge_file.read_text().strip()
+            if _last_purge_date == today_str:
                 return
         tokens = database.get_all_tokens()
         total = 0
@@ -61,6 +130,7 @@ def _run_daily_task_purge():
         if total:
             logger.info(f"Daily task purge: removed {total} old completions")
         _last_purge_file.write_text(today_str)
+        _last_purge_date = today_str
     except Exception as e:
         logger.error(f"Daily task purge failed: {e}")
 
@@ -86,60 +156,116 @@ def _run_shift_reminders():
 
 
 def _poll_and_process():
-    """Check for one pending submission or estimate and process it."""
+    """Claim the oldest queued task of any kind and process it.
+
+    One query finds and claims the work. Pending submissions are claimed
+    as a batch, so a burst of uploads is worked through back-to-back
+    instead of one submission per POLL_INTERVAL.
+    """
     _run_daily_task_purge()
     _run_shift_reminders()
-    row = database.claim_next_pending()
-    if row is None:
-        _poll_and_process_estimate()
-        _poll_and_process_append()
-        return
-
-    _tok = database.get_token(row["token"])
+    kind, rows = database.claim_next_task(BATCH_SIZE)
+    if kind == "estimate":
+        _process_estimate(rows[0])
+    elif kind == "append":
+        _process_append(rows[0])
+    elif kind == "submission":
+        _process_submissions(rows)
+
+
+def _process_submissions(rows):
+    """Process a claimed batch of submissions in order."""
+    # Token settings, job and category names for every submission in the
+    # batch: one query each instead of up to four lookups per submission
+    tokens = {t: database.get_token(t) for t in {r["token"] for r in rows}}
+    jobs = database.get_jobs(r["job_id"] for r in rows if r.get("job_id"))
+    categories = database.get_categories(
+        r[f] for r in rows for f in ("category_1_id", "category_2_id") if r.get(f)
+    )
+    # Double-buffer audio decode: submission N+1 decodes on the prefetch
+    # thread while N is on the GPU
+    audio = _prefetch_audio(rows[0])
+    pdfs = []
+    for i, row in enumerate(rows):
+        next_audio = _prefetch_audio(rows[i + 1]) if i + 1 < len(rows) else None
+        pdfs.append(_process_submission(row, tokens, jobs, categories, audio))
+        audio = next_audio
+    # _pdf_writer is one thread, so this runs after every PDF above is written
+    _pdf_writer.submit(_on_writer, _complete_submissions, [f for f in pdfs if f is not None])
+
+
+def _prefetch_audio(row):
+    """Start decoding a submission's audio; returns a Future of the array."""
+    path = config.RECEIPTS_DIR / row["token"] / row["month_folder"] / row["audio_file"]
+    return _audio_prefetch.submit(transcriber.load_audio, path)
+
+
+def _process_submission(row, tokens, jobs, categories, audio):
+    """Transcribe one claimed submission and queue its receipt PDF.
+
+    ``tokens``, ``jobs`` and ``categories`` map keys to rows, prefetched
+    for the batch;
+    ``audio`` is the Future from _prefetch_audio(). The PDF is built on
+    _pdf_writer, so the worker moves on to the next transcription as soon
+    as this one is done. Returns the PDF's Future, or None if the
+    submission was skipped or failed.
+    """
+    _tok = tokens.get(row["token"])
     if not _tok or not _tok.get("feature_receipts", 1):
-        return
+        return None
 
     submission_id = row["id"]
+    job_id = row.get("job_id")
+    category_ids = (row.get("category_1_id"), row.get("category_2_id"))
     logger.info(f"Processing submission {submission_id} for {row['company_name']}")
 
+    try:
+        # Transcribe audio
+        text = transcriber.transcribe(audio.result())
+
+        # Look up job name and category names for PDF
+        job = jobs.get(job_id) if job_id else None
+        job_name = job["job_name"] if job else None
+        category_names = [categories[c]["name"] for c in category_ids if c in categories]
+
+        return _pdf_writer.submit(_on_writer, _write_submission_pdf, row, text, job_name, category_names)
+
+    except Exception as e:
+        logger.error(f"Task failed for submission {submission_id}: {e}")
+        try:
+            database.update_submission_error(submission_id, f"Error: {e}")
+        except Exception:
+            pass
+        return None
+
+
+def _on_writer(fn, *args):
+    """Run ``fn`` on _pdf_writer, never leaving a transaction open after it."""
+    try:
+        return fn(*args)
+    finally:
+        database.end_thread_transaction()
+
+
+def _write_submission_pdf(row, text, job_name, category_names):
+    """Write a transcribed submission's receipt PDF.
+
+    Returns (row, text, pdf_filename) for _complete_submissions(), or None
+    if the PDF failed and the submission was marked as an error.
+    """
+    submission_id = row["id"]
     try:
         token = row["token"]
         company_name = row["company_name"]
         month_folder = row["month_folder"]
         image_file = row["image_file"]
-        audio_file = row["audio_file"]
         timestamp = row["timestamp"]
 
         folder = config.RECEIPTS_DIR / token / month_folder
-        audio_path = folder / audio_file
         image_path = folder / image_file
 
-        base_name = Path(image_file).stem
-        pdf_filename = f"{base_name}.pdf"
-        thumb_filename = f"{base_name}_thumb.jpg"
-
-        # Fix EXIF orientation
-        pdf_generator.fix_image_orientation(image_path)
-
-        # Generate thumbnail
-        thumb_path = folder / thumb_filename
-        pdf_generator.generate_web_thumbnail(image_path, thumb_path)
-
-        # Transcribe audio
-        text = transcriber.transcribe(audio_path)
-
-        # Look up job name and category names for PDF
-        job_name = None
-        category_names = []
-        if row.get("job_id"):
-            job = database.get_job(row["job_id"])
-            if job:
-                job_name = job["job_name"]
-        for cat_field in ("category_1_id", "category_2_id"):
-            if row.get(cat_field):
-                cat = database.get_category(row[cat_field])
-                if cat:
-                    category_names.append(cat["name"])
+        # EXIF orientation and the web thumbnail are done at upload time
+        pdf_filename = f"{Path(image_file).stem}.pdf"
 
         # Generate combined PDF
         pdf_path = folder / pdf_filename
@@ -154,34 +280,64 @@ def _poll_and_process():
             category_names=category_names if category_names else None,
         )
 
-        database.update_submission_transcription(submission_id, text, pdf_filename)
-        logger.info(f"Completed submission {submission_id} for {company_name}")
+        return row, text, pdf_filename
 
+    except Exception as e:
+        logger.error(f"Task failed for submission {submission_id}: {e}")
+        try:
+            database.update_submission_error(submission_id, f"Error: {e}")
+        except Exception:
+            pass
+        return None
+
+
+def _complete_submissions(pdfs):
+    """Mark a batch's written submissions complete with one commit.
+
+    Rows are only updated once their PDFs are on disk, so a completed
+    submission never links to a missing file.
+    """
+    done = [r for r in (f.result() for f in pdfs) if r is not None]
+    if not done:
+        return
+    try:
+        database.complete_submissions(
+            (row["id"], text, pdf_filename) for row, text, pdf_filename in done
+        )
+    except Exception as e:
+        logger.error(f"Completing submissions failed: {e}")
+        for row, _, _ in done:
+            try:
+                database.update_submission_error(row["id"], f"Error: {e}")
+            except Exception:
+                pass
+        return
+
+    for row, _, _ in done:
+        token = row["token"]
+        logger.info(f"Completed submission {row['id']} for {row['company_name']}")
         try:
             from routes.notifications import notify_admins
             notify_admins(
                 token, "receipt",
                 "Receipt processed",
-                f"Company: {company_name}",
+                f"Company: {row['company_name']}",
                 url=f"/admin/receipts?token={token}",
             )
         except Exception:
             pass
 
-    except Exception as e:
-        logger.error(f"Task failed for submission {submission_id}: {e}")
-        try:
-            database.update_submission_error(submission_id, f"Error: {e}")
-        except Exception:
-            pass
 
+def _has_audio(path):
+    """True if ``path`` is a non-empty file, with a single stat call."""
+    try:
+        return os.stat(path).st_size > 0
+    except OSError:
+        return False
 
-def _poll_and_process_estimate():
-    """Check for one pending estimate and process it."""
-    est = database.claim_next_pending_estimate()
-    if est is None:
-        return
 
+def _process_estimate(est):
+    """Transcribe one claimed estimate and run AI task extraction."""
     _tok = database.get_token(est["token"])
     if not _tok or not _tok.get("feature_estimates", 1):
         return
@@ -196,7 +352,7 @@ def _poll_and_process_estimate():
         if audio_file:
             # Audio stored under receipts/{token}/estimates/
             audio_path = config.RECEIPTS_DIR / token / "estimates" / audio_file
-            if audio_path.exists():
+            if _has_audio(audio_path):
                 text = transcriber.transcribe(audio_path)
             else:
                 text = f"(audio file not found: {audio_file})"
@@ -237,12 +393,8 @@ def _poll_and_process_estimate():
             pass
 
 
-def _poll_and_process_append():
-    """Check for one estimate needing append transcription and process it."""
-    est = database.claim_next_appending_estimate()
-    if est is None:
-        return
-
+def _process_append(est):
+    """Transcribe one claimed append recording onto its estimate."""
     estimate_id = est["id"]
     logger.info(f"Appending transcription for estimate {estimate_id}")
 
@@ -253,7 +405,7 @@ def _poll_and_process_append():
             return
 
         audio_path = Path(audio_path_str)
-        if audio_path.exists():
+        if _has_audio(audio_path):
             text = transcriber.transcribe(audio_path)
         else:
             text = f"(append audio file not found: {audio_path_str})"
@@ -269,10 +421,23 @@ def _poll_and_process_append():
             pass
 
 
+def run_worker():
+    """Run the worker loop in the foreground (gpu_worker.py entrypoint)."""
+    logger.info("Task queue worker started (dedicated process)")
+    _worker()
+
+
 def start_worker():
-    """Start the background worker thread (safe to call from every Gunicorn worker)."""
+    """Start the worker loop on a background thread (single-process dev server).
+
+    A no-op when the dedicated worker process is already running on this
+    host, so a dev server never polls or loads Whisper alongside it.
+    """
     global _worker_thread
     if _worker_thread is None or not _worker_thread.is_alive():
+        if _worker_running():
+            logger.info("Task queue worker already running in another process")
+            return
         _worker_thread = threading.Thread(target=_worker, daemon=True)
         _worker_thread.start()
         logger.info("Task queue worker started (DB-polling mode)")
@@ -0,0 +1,26 @@
+"""Wake-up ping for the task queue worker.
+
+Kept free of heavy imports so the Gunicorn web workers can wake
+gpu_worker.py after queueing a row without importing task_queue (and,
+through it, faster-whisper).
+"""
+
+import socket
+
+import config
+
+# Datagram socket the worker binds (task_queue._open_wake_socket)
+WAKE_PATH = config.INSTANCE_DIR / "task_worker.sock"
+
+
+def notify():
+    """Wake the worker process to poll now. Call after queueing a task.
+
+    A missing or busy worker is fine: it finds the row on its next poll.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.setblocking(False)
+            sock.sendto(b"!", str(WAKE_PATH))
+    except OSError:
+        pass
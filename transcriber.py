@@ -1,20 +1,178 @@
-import whisper
+import os
+
+import ctranslate2
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
+from faster_whisper.feature_extractor import FeatureExtractor
+from faster_whisper.vad import VadOptions, get_speech_timestamps
 
 import config
 
 _model = None
+_pipeline = None
+_device = None
+
+SAMPLE_RATE = 16000
+# One Whisper window; shorter recordings get a speech check first
+_SHORT_CLIP_SAMPLES = 30 * SAMPLE_RATE
+# Less voiced speech than this (seconds) transcribes to "" (mistaps, silence)
+MIN_SPEECH_S = 0.3
+
+
+class _TorchFeatureExtractor(FeatureExtractor):
+    """faster-whisper's log-mel spectrogram, computed with torch on a device.
+
+    Same math as FeatureExtractor.__call__ (numpy, CPU), which ports
+    openai-whisper's log_mel_spectrogram. The Hann window and mel filterbank
+    are moved to the device once; the result comes back as numpy because
+    that is what CTranslate2 takes.
+    """
+
+    def __init__(self, base, device):
+        import torch
+
+        self.__dict__.update(base.__dict__)
+        self._window = torch.hann_window(self.n_fft, device=device)
+        self._filters = torch.from_numpy(self.mel_filters).to(device)
+
+    def __call__(self, waveform, padding=160, chunk_length=None):
+        import torch
+
+        if chunk_length is not None:
+            self.n_samples = chunk_length * self.sampling_rate
+            self.nb_max_frames = self.n_samples // self.hop_length
+
+        audio = torch.from_numpy(np.asarray(waveform, dtype=np.float32))
+        audio = audio.to(self._window.device, non_blocking=True)
+        if padding:
+            audio = torch.nn.functional.pad(audio, (0, padding))
+
+        stft = torch.stft(
+            audio, self.n_fft, self.hop_length,
+            window=self._window, return_complex=True,
+        )
+        magnitudes = stft[..., :-1].abs() ** 2
+        mel_spec = self._filters @ magnitudes
+
+        log_spec = torch.clamp(mel_spec, min=1e-10).log10()
+        log_spec = torch.maximum(log_spec, log_spec.max() - 8.0)
+        log_spec = (log_spec + 4.0) / 4.0
+        return log_spec.cpu().numpy()
+
+
+def _cuda_feature_extractor(base):
+    """GPU featurizer for the model, or ``base`` when torch has no CUDA."""
+    try:
+        import torch
+    except ImportError:
+        return base
+    if not torch.cuda.is_available():
+        return base
+    return _TorchFeatureExtractor(base, "cuda")
+
+
+def _pick_device():
+    """Resolve WHISPER_DEVICE, mapping "auto" to CUDA when a GPU is visible."""
+    if config.WHISPER_DEVICE != "auto":
+        return config.WHISPER_DEVICE
+    return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+
+
+def _load_whisper(**kwargs):
+    """Build the WhisperModel from the local copy in WHISPER_MODEL_DIR.
+
+    Only the first load (or a new WHISPER_MODEL) downloads from the
+    Hugging Face Hub; restarts read the converted weights straight from
+    disk, usually still in the page cache, without a hub round trip.
+    """
+    kwargs["download_root"] = str(config.WHISPER_MODEL_DIR)
+    try:
+        return WhisperModel(config.WHISPER_MODEL, local_files_only=True, **kwargs)
+    except FileNotFoundError:
+        return WhisperModel(config.WHISPER_MODEL, **kwargs)
 
 
 def get_model():
-    """Lazy-load the Whisper model (loads once, reuses)."""
-    global _model
+    """Lazy-load the Whisper model (loads once, reuses).
+
+    Only the task_queue worker calls this, once at startup and then per
+    task, so CUDA is touched in that process alone, never at import.
+    """
+    global _model, _device
     if _model is None:
-        _model = whisper.load_model(config.WHISPER_MODEL)
+        _device = _pick_device()
+        # FP16 math on tensor cores with int8 weights on GPU; int8 on CPU
+        compute_type = config.WHISPER_COMPUTE_TYPE or (
+            "int8_float16" if _device == "cuda" else "int8"
+        )
+        _model = _load_whisper(
+            device=_device,
+            compute_type=compute_type,
+            cpu_threads=os.cpu_count() or 0,
+        )
+        if _device == "cuda":
+            # Log-mel for every VAD window on the GPU instead of numpy
+            _model.feature_extractor = _cuda_feature_extractor(_model.feature_extractor)
     return _model
 
 
-def transcribe(audio_path):
-    """Transcribe an audio file. Returns the text string."""
-    model = get_model()
-    result = model.transcribe(str(audio_path), fp16=False)
-    return result["text"].strip()
+def get_pipeline():
+    """Batched front end over the shared model (created once, reuses)."""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = BatchedInferencePipeline(model=get_model())
+    return _pipeline
+
+
+def warm_up():
+    """Load the model and, on CUDA, run one full-batch encoder pass.
+
+    The first encode on a GPU creates the cuBLAS/cuDNN handles and grows
+    CTranslate2's memory cache to batch size; doing it on silence here
+    keeps that setup off the first real recording.
+    """
+    model = get_pipeline().model
+    if _device != "cuda":
+        return
+    window = np.zeros(_SHORT_CLIP_SAMPLES, dtype=np.float32)
+    features = model.feature_extractor(window)[..., :-1]
+    model.encode(np.stack([features] * config.WHISPER_BATCH_SIZE))
+
+
+def load_audio(audio_path):
+    """Decode an audio file to the 16 kHz mono float32 array Whisper takes.
+
+    Decoding and resampling happen in-process through PyAV (no ffmpeg
+    subprocess per file). Pure CPU work, safe to run on another thread
+    while transcribe() runs.
+    """
+    return decode_audio(str(audio_path), sampling_rate=SAMPLE_RATE)
+
+
+def _has_speech(audio):
+    """True if Silero VAD finds at least MIN_SPEECH_S of speech in ``audio``."""
+    # No edge padding, so the total is the speech actually detected
+    spans = get_speech_timestamps(audio, VadOptions(speech_pad_ms=0))
+    return sum(s["end"] - s["start"] for s in spans) >= MIN_SPEECH_S * SAMPLE_RATE
+
+
+def transcribe(audio):
+    """Transcribe an audio file path or a load_audio() array. Returns the text string."""
+    if not isinstance(audio, np.ndarray):
+        audio = load_audio(audio)
+    # Short uploads are often mistaps with no speech. The VAD pass is cheap
+    # at this length and skips the model (and its language-ID pass) entirely
+    if len(audio) <= _SHORT_CLIP_SAMPLES and not _has_speech(audio):
+        return ""
+    # The VAD filter splits speech into up-to-30 s windows, dropping silent
+    # stretches, and the pipeline decodes up to WHISPER_BATCH_SIZE windows
+    # per generate call. Greedy decoding, as openai-whisper's transcribe()
+    # did by default, and with the language pinned there is no detection
+    # pass over the first window. Segments are generated lazily, so
+    # decoding runs inside the join.
+    segments, _ = get_pipeline().transcribe(
+        audio, language=config.WHISPER_LANGUAGE, beam_size=1,
+        without_timestamps=True, vad_filter=True,
+        batch_size=config.WHISPER_BATCH_SIZE,
+    )
+    return "".join(s.text for s in segments).strip()